@@ -1,4 +1,16 @@
 # -*- mode: python ; coding: utf-8 -*-
+#
+# pyinstaller DUMB.spec               -> dist/DUMB.exe, a single file
+# pyinstaller DUMB.spec -- --onedir   -> dist/DUMB/DUMB.exe with its libraries next to it
+#
+# The single file unpacks all of Python, Qt, numpy and pandas to a temp
+# folder on every launch; the onedir build starts them in place and opens
+# several times faster. Ship the whole dist/DUMB folder (e.g. zipped).
+import argparse
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--onedir", action="store_true", help="Build a folder instead of a single executable")
+options = parser.parse_args()
 
 
 a = Analysis(
@@ -10,31 +22,62 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Optional pandas back-ends the tool never uses
+    excludes=['tkinter', 'matplotlib', 'IPython'],
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='DUMB',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    version='version_info.txt',
-    icon=['icon.ico'],
-)
+if options.onedir:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='DUMB',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        # UPX-packed libraries would be decompressed on every launch
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        version='version_info.txt',
+        icon=['icon.ico'],
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        name='DUMB',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='DUMB',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        version='version_info.txt',
+        icon=['icon.ico'],
+    )
@@ -0,0 +1,197 @@
+"""
+Local stand-in for an Odoo server, for testing direct BoM import offline.
+
+Serves the XML-RPC endpoints odoo_rpc uses (/xmlrpc/2/common authenticate,
+/xmlrpc/2/object execute_kw for ir.model.data, uom.uom and mrp.bom) from
+memory. Every external id and UoM name is known, latency can be added per
+call and the reply to every Nth mrp.bom create can be lost after its BoMs
+were created (the client gets an HTTP error), so batching, pooling and
+retries can be measured without a real database.
+
+Usage:
+    python bench/odoo_mock.py --port 8069 --latency 0.05
+    python bench/odoo_mock.py --throughput variants.xlsx components.xlsx mapping.json
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import xmlrpc.client
+from socketserver import ThreadingMixIn
+from xmlrpc.server import MultiPathXMLRPCServer, SimpleXMLRPCDispatcher, SimpleXMLRPCRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MOCK_DB = "mock"
+MOCK_USER = "admin"
+MOCK_PASSWORD = "admin"
+
+
+class ReplyLost(Exception):
+    """Raised after a call did its work, to answer with an HTTP error instead of its result."""
+
+
+class _Server(ThreadingMixIn, MultiPathXMLRPCServer):
+    daemon_threads = True
+
+    def _marshaled_dispatch(self, data, dispatch_method=None, path=None):
+        response = super()._marshaled_dispatch(data, dispatch_method, path)
+        if getattr(self.reply_lost, "flag", False):
+            self.reply_lost.flag = False
+            # Turned into a 500 response by the request handler
+            raise ReplyLost()
+        return response
+
+
+class _RequestHandler(SimpleXMLRPCRequestHandler):
+    rpc_paths = ("/xmlrpc/2/common", "/xmlrpc/2/object")
+    # Let clients keep their connection open between calls, like Odoo does
+    protocol_version = "HTTP/1.1"
+
+
+class MockOdoo:
+    """
+    In-memory Odoo: resolves any external id or UoM name to a stable id and
+    records created BoMs and call counts.
+    """
+
+    def __init__(self, latency=0.0, fail_every=0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        # Set on the request's thread when its reply should be lost
+        self.reply_lost = threading.local()
+        self.ids = {}
+        self.boms = []
+        self.calls = {}
+        self.create_calls = 0
+
+    def _id_for(self, key):
+        with self.lock:
+            return self.ids.setdefault(key, len(self.ids) + 1)
+
+    # ------------------ ENDPOINTS ------------------
+
+    def authenticate(self, db, login, password, user_agent_env):
+        return 2 if (db, login, password) == (MOCK_DB, MOCK_USER, MOCK_PASSWORD) else False
+
+    def version(self):
+        return {"server_version": "17.0-mock"}
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.calls[(model, method)] = self.calls.get((model, method), 0) + 1
+
+        if model == "ir.model.data" and method == "search_read":
+            modules, names = args[0][0][2], args[0][1][2]
+            return [
+                {"module": module, "name": name, "res_id": self._id_for((module, name))}
+                for name in names for module in modules
+            ]
+        if model == "uom.uom" and method == "search_read":
+            return [{"id": self._id_for(("uom", name)), "name": name} for name in args[0][0][2]]
+        if model == "mrp.bom" and method == "create":
+            with self.lock:
+                self.create_calls += 1
+                start = len(self.boms)
+                self.boms.extend(args[0])
+                if self.fail_every and self.create_calls % self.fail_every == 0:
+                    self.reply_lost.flag = True
+                return list(range(start + 1, len(self.boms) + 1))
+        if model == "mrp.bom" and method == "search":
+            # Only the last-id lookup: order id desc, limit 1
+            with self.lock:
+                return [len(self.boms)] if self.boms else []
+        if model == "mrp.bom" and method == "search_read":
+            conditions = {field: value for field, _, value in args[0]}
+            product_ids = set(conditions.get("product_id", ()))
+            with self.lock:
+                return [
+                    {"id": bom_id, "product_id": [bom["product_id"], ""]}
+                    for bom_id, bom in enumerate(self.boms, 1)
+                    if bom_id > conditions.get("id", 0) and bom["product_id"] in product_ids
+                ]
+        raise xmlrpc.client.Fault(2, f"Method {model}.{method} not available in the mock")
+
+
+def serve(mock, host="127.0.0.1", port=0):
+    """Starts the mock on a background thread and returns (server, url)."""
+    server = _Server((host, port), requestHandler=_RequestHandler, allow_none=True, logRequests=False)
+    server.reply_lost = mock.reply_lost
+    common = SimpleXMLRPCDispatcher(allow_none=True)
+    common.register_function(mock.authenticate, "authenticate")
+    common.register_function(mock.version, "version")
+    obj = SimpleXMLRPCDispatcher(allow_none=True)
+    obj.register_function(mock.execute_kw, "execute_kw")
+    server.add_dispatcher("/xmlrpc/2/common", common)
+    server.add_dispatcher("/xmlrpc/2/object", obj)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def throughput(variant_path, product_path, mapping_path, batch_sizes, pool_sizes, latency):
+    """Imports every mapped template into a fresh mock for each batch/pool size and prints BoMs/s."""
+    import bom_engine
+    import loaders
+    import odoo_rpc
+
+    variant_data = loaders.read_export(variant_path, loaders.VARIANT_COLUMNS)
+    variant_index = bom_engine.VariantIndex(variant_data)
+    product_info_map = bom_engine.build_product_info_map(loaders.read_export(product_path, loaders.PRODUCT_COLUMNS))
+    mapping = bom_engine.load_mapping(mapping_path, product_info_map)
+    rows = [
+        row
+        for tmpl_id, assignments in mapping.templates.items()
+        for row in bom_engine.iter_bom_rows(
+            variant_index.iter_variants(tmpl_id), assignments, 1.0, "Kit",
+            bom_engine.TemplateRules(variant_index, tmpl_id, mapping.template_rules.get(tmpl_id))
+        )
+    ]
+
+    for pool_size in pool_sizes:
+        for batch_size in batch_sizes:
+            mock = MockOdoo(latency=latency)
+            server, url = serve(mock)
+            try:
+                pool = odoo_rpc.ConnectionPool(url, MOCK_DB, MOCK_USER, MOCK_PASSWORD, size=pool_size)
+                start = time.perf_counter()
+                result = odoo_rpc.import_boms(pool, rows, batch_size=batch_size)
+                seconds = time.perf_counter() - start
+            finally:
+                server.shutdown()
+                server.server_close()
+            calls = sum(mock.calls.values())
+            print(f"pool {pool_size:>2}  batch {batch_size:>5}: {result['created']:>7} BoMs in {seconds:7.2f} s "
+                  f"({result['created'] / seconds:9.0f} BoMs/s, {calls} calls, {len(result['errors'])} errors)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in Odoo XML-RPC server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8069)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every call")
+    parser.add_argument("--fail-every", type=int, default=0, help="Lose the reply to every Nth mrp.bom create call")
+    parser.add_argument("--throughput", nargs=3, metavar=("VARIANTS", "COMPONENTS", "MAPPING"),
+                        help="Measure import throughput for these files instead of serving")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args(argv)
+
+    if args.throughput:
+        throughput(*args.throughput, args.batch_sizes, args.pool_sizes, args.latency)
+        return 0
+
+    server, url = serve(MockOdoo(args.latency, args.fail_every), args.host, args.port)
+    print(f"Mock Odoo on {url} (db '{MOCK_DB}', user '{MOCK_USER}', password '{MOCK_PASSWORD}')")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
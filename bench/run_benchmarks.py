@@ -0,0 +1,257 @@
+"""
+End-to-end benchmarks for D.U.M.B.
+
+Generates synthetic exports for each size tier, then times every stage of
+the tool and records its peak traced memory. Widget stages run on a real
+AttributeMapper window with Qt in offscreen mode. Results are written as a
+text table (bench_output.txt) and optionally as JSON, which a later run can
+be compared against.
+
+Usage:
+    python bench/run_benchmarks.py
+    python bench/run_benchmarks.py --tiers small medium --json before.json
+    python bench/run_benchmarks.py --tiers medium --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+import bom_engine  # noqa: E402
+import loaders  # noqa: E402
+import main as gui  # noqa: E402
+import product_search  # noqa: E402
+import synthetic_exports  # noqa: E402
+
+TIERS = {
+    "small": dict(templates=5, attributes=3, values=5, variants=100, materials=1000, rules=20),
+    "medium": dict(templates=20, attributes=4, values=8, variants=1000, materials=10000, rules=200),
+    "large": dict(templates=50, attributes=5, values=12, variants=4000, materials=50000, rules=2000),
+}
+
+# Component lines added in the add_component_line stage
+COMPONENT_LINES = 200
+
+
+def measure(setup, run):
+    """
+    Runs setup() then run() twice: once for wall time, once under tracemalloc
+    for peak memory. Returns (seconds, peak_bytes, result of the timed run).
+    """
+    setup()
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+
+    setup()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def bench_tier(name, params, work_dir, app):
+    """Runs every stage for one tier and returns { stage: {seconds, peak_bytes} }."""
+    tier_dir = os.path.join(work_dir, name)
+    variant_path, product_path, mapping_path = synthetic_exports.generate(tier_dir, **params)
+    window = gui.AttributeMapper()
+    stages = {}
+
+    def record(stage, setup, run):
+        seconds, peak, result = measure(setup, run)
+        stages[stage] = {"seconds": round(seconds, 4), "peak_bytes": peak}
+        print(f"  {stage:<26} {seconds:9.3f} s {peak / 1e6:9.1f} MB", flush=True)
+        return result
+
+    def noop():
+        pass
+
+    # ------------------ FILE LOADING ------------------
+
+    def load_variants():
+        variant_data = loaders.read_export(variant_path, loaders.VARIANT_COLUMNS)
+        bom_engine.check_variant_columns(variant_data)
+        return bom_engine.VariantIndex(variant_data)
+    window.variant_index = record("load_variant_file", noop, load_variants)
+
+    def load_products():
+        product_data = loaders.read_export(product_path, loaders.PRODUCT_COLUMNS)
+        window.product_info_map = bom_engine.build_product_info_map(product_data)
+        window.product_search = product_search.ProductSearchIndex(
+            product_data[bom_engine.PRODUCT_COLUMN].dropna().astype(str)
+        )
+        window.refresh_product_model()
+    record("load_product_file", noop, load_products)
+
+    queries = ["screw", "m4x2", "zinc 0001", "brakcet oak"]
+    record("search_products", noop, lambda: [window.search_products(q) for q in queries])
+
+    # ------------------ TEMPLATE & ATTRIBUTES ------------------
+
+    window.mapping = bom_engine.load_mapping(mapping_path, window.product_info_map)
+    combo = window.product_group_combo
+
+    def populate_groups():
+        combo.blockSignals(True)
+        window.populate_group_dropdown()
+        combo.blockSignals(False)
+    record("populate_group_dropdown", noop, populate_groups)
+
+    # Largest template
+    tmpl_id = max(window.variant_index.template_rows, key=lambda t: len(window.variant_index.template_rows[t]))
+
+    def select_template():
+        combo.blockSignals(True)
+        combo.setCurrentIndex(combo.findData(tmpl_id))
+        combo.blockSignals(False)
+    record("populate_attributes", select_template, window.populate_attributes)
+
+    # ------------------ COMPONENT LINES ------------------
+
+    model = window.assignment_model
+    first_key = model.value_keys[0]
+
+    def add_lines():
+        for _ in range(COMPONENT_LINES):
+            window.assignment_view.setCurrentIndex(model.value_index(first_key))
+            window.add_component_line()
+
+    def reset_lines():
+        del window.mapping.assignments(tmpl_id)[first_key][:]
+        window.populate_attributes()
+    record("add_component_line", reset_lines, add_lines)
+    reset_lines()
+
+    validator = bom_engine.MappingValidator(window.variant_index)
+    record("validate_mapping", noop, lambda: validator.validate(window.mapping, window.product_info_map))
+
+    # ------------------ GENERATION ------------------
+
+    output_path = os.path.join(tier_dir, "bom.csv")
+    rules = window.mapping.rules(tmpl_id)
+    template_rules = record("match_rules", noop, lambda: bom_engine.TemplateRules(
+        window.variant_index, tmpl_id, rules
+    ))
+
+    def generate_template():
+        rows = bom_engine.iter_bom_rows(
+            window.variant_index.iter_variants(tmpl_id), window.mapping.assignments(tmpl_id), 1.0, "Kit",
+            template_rules
+        )
+        return bom_engine.write_bom_export(output_path, rows)
+    record("generate_csv", noop, generate_template)
+
+    batch_dir = os.path.join(tier_dir, "batch")
+    record("batch_all_templates", noop, lambda: bom_engine.run_batch(
+        window.variant_index, window.mapping, batch_dir, workers=1
+    ))
+
+    window.update_memory_label()
+    memory_bytes = {
+        "variants": window.variant_index.memory_bytes(),
+        "components": window.product_info_map.memory_bytes() + window.product_search.memory_bytes(),
+    }
+    print(f"  {'retained data':<26} variants {memory_bytes['variants'] / 1e6:.1f} MB, "
+          f"components {memory_bytes['components'] / 1e6:.1f} MB", flush=True)
+
+    window.deleteLater()
+    app.processEvents()
+    return {"params": params, "variant_rows": len(window.variant_index.variant_ids), "stages": stages,
+            "memory_bytes": memory_bytes}
+
+
+def format_report(results, baseline=None):
+    lines = [
+        f"D.U.M.B benchmarks - {results['version']} - {results['timestamp']}",
+        f"Python {results['python']} on {results['platform']}",
+        "",
+    ]
+    for tier, tier_result in results["tiers"].items():
+        lines.append(f"[{tier}] {tier_result['params']} ({tier_result['variant_rows']} variant rows)")
+        base_tier = (baseline or {}).get("tiers", {}).get(tier, {}).get("stages", {})
+        for stage, values in tier_result["stages"].items():
+            line = f"  {stage:<26} {values['seconds']:9.3f} s {values['peak_bytes'] / 1e6:9.1f} MB"
+            base = base_tier.get(stage)
+            if base and base["seconds"] > 0:
+                line += f"   x{values['seconds'] / base['seconds']:.2f} time"
+                if base["peak_bytes"] > 0:
+                    line += f"  x{values['peak_bytes'] / base['peak_bytes']:.2f} memory"
+            lines.append(line)
+        memory_bytes = tier_result.get("memory_bytes")
+        if memory_bytes:
+            lines.append(f"  {'retained data':<26} variants {memory_bytes['variants'] / 1e6:.1f} MB, "
+                         f"components {memory_bytes['components'] / 1e6:.1f} MB")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def product_version():
+    try:
+        with open(os.path.join(ROOT, "version.yaml"), encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("ProductVersion:"):
+                    return line.split(":", 1)[1].strip().strip('"')
+    except OSError:
+        pass
+    return "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every stage of D.U.M.B across size tiers.")
+    parser.add_argument("--tiers", nargs="+", choices=list(TIERS), default=["small", "medium"])
+    parser.add_argument("--output", default=os.path.join(ROOT, "bench_output.txt"), help="Text report path")
+    parser.add_argument("--json", dest="json_path", help="Also write the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--work-dir", help="Where to write the synthetic exports (default: a temp dir)")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="dumb-bench-")
+
+    results = {
+        "version": product_version(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tiers": {},
+    }
+    try:
+        for tier in args.tiers:
+            print(f"[{tier}]", flush=True)
+            results["tiers"][tier] = bench_tier(tier, TIERS[tier], work_dir, app)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = format_report(results, baseline)
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(report + "\n")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    print()
+    print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
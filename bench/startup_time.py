@@ -0,0 +1,84 @@
+"""
+Cold-start check for D.U.M.B.
+
+Launches the tool (the script, or a PyInstaller build with --exe) several
+times with --startup-check, which quits as soon as the main window is shown,
+and reports the wall time per launch and the in-process time to the first
+painted window. Fails when the median start-up exceeds --max-seconds or when
+numpy / pandas / openpyxl were imported before the window appeared, so
+start-up regressions show up in CI or before a release.
+
+Usage:
+    python bench/startup_time.py
+    python bench/startup_time.py --exe dist/DUMB/DUMB.exe --runs 5 --max-seconds 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def launch(command, report_path, timeout):
+    """Runs one start-up check; returns (wall seconds, report dict)."""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.perf_counter()
+    subprocess.run(command + ["--startup-check", report_path], env=env, timeout=timeout,
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wall = time.perf_counter() - start
+    with open(report_path, encoding="utf-8") as f:
+        return wall, json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold start of D.U.M.B.")
+    parser.add_argument("--exe", help="Packaged executable to launch (default: python main.py)")
+    parser.add_argument("--runs", type=int, default=5, help="Number of launches (default: 5)")
+    parser.add_argument("--max-seconds", type=float, help="Fail when the median wall time exceeds this")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds before a launch counts as hung")
+    parser.add_argument("--json", dest="json_path", help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    command = [args.exe] if args.exe else [sys.executable, os.path.join(ROOT, "main.py")]
+    walls, windows, heavy = [], [], set()
+    with tempfile.TemporaryDirectory(prefix="dumb-startup-") as tmp_dir:
+        for run in range(1, args.runs + 1):
+            wall, report = launch(command, os.path.join(tmp_dir, f"run{run}.json"), args.timeout)
+            walls.append(wall)
+            windows.append(report["startup_seconds"])
+            heavy.update(report["heavy_modules"])
+            print(f"run {run}: {wall:.3f} s to exit, window after {report['startup_seconds']:.3f} s "
+                  f"(RSS {(report['rss_bytes'] or 0) / 1e6:.0f} MB)", flush=True)
+
+    results = {
+        "command": command,
+        "runs": args.runs,
+        "first_wall_seconds": round(walls[0], 4),
+        "median_wall_seconds": round(statistics.median(walls), 4),
+        "median_window_seconds": round(statistics.median(windows), 4),
+        "heavy_modules": sorted(heavy),
+    }
+    print(f"median: {results['median_wall_seconds']:.3f} s to exit, "
+          f"window after {results['median_window_seconds']:.3f} s (first launch {walls[0]:.3f} s)")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    if heavy:
+        print(f"FAIL: imported at start-up: {', '.join(sorted(heavy))}")
+        failed = True
+    if args.max_seconds is not None and results["median_wall_seconds"] > args.max_seconds:
+        print(f"FAIL: median start-up above {args.max_seconds:.3f} s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,164 @@
+"""
+Synthetic Odoo exports for benchmarking D.U.M.B.
+
+Writes a product variant export, a components export (both with the real
+Odoo column names) and a mapping file that assigns components to a share of
+the attribute values, so every stage of the tool has realistic work to do.
+
+Usage:
+    python bench/synthetic_exports.py out_dir --templates 50 --attributes 3 --values 10 --variants 500 --materials 20000
+"""
+import os
+import csv
+import sys
+import random
+import argparse
+import itertools
+
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bom_engine  # noqa: E402
+
+VARIANT_HEADER = [
+    bom_engine.VARIANT_ID_COLUMN,
+    bom_engine.PRODUCT_GROUP_COLUMN,
+    bom_engine.PRODUCT_GROUP_NAME_COLUMN,
+    bom_engine.VARIANT_COLUMN,
+]
+PRODUCT_HEADER = [
+    bom_engine.PRODUCT_ID_COLUMN,
+    bom_engine.PRODUCT_COLUMN,
+    bom_engine.UOM_COLUMN,
+]
+
+UOMS = ["Units", "kg", "g", "m", "cm", "L", "mL", "Dozens"]
+MATERIAL_WORDS = [
+    "Screw", "Bolt", "Nut", "Washer", "Bracket", "Panel", "Board", "Hinge", "Handle", "Dowel",
+    "Glue", "Paint", "Varnish", "Fabric", "Foam", "Spring", "Leg", "Frame", "Rail", "Cap",
+]
+MATERIAL_FINISHES = ["zinc", "steel", "brass", "oak", "pine", "walnut", "black", "white", "raw", "chrome"]
+
+
+def material_names(count, rng):
+    """Returns `count` distinct names like 'Screw M4x20 zinc 00017'."""
+    names = []
+    for i in range(count):
+        word = rng.choice(MATERIAL_WORDS)
+        size = f"M{rng.randint(2, 12)}x{rng.randint(5, 120)}"
+        names.append(f"{word} {size} {rng.choice(MATERIAL_FINISHES)} {i:05d}")
+    return names
+
+
+def variant_rows(templates, attributes, values, variants, rng):
+    """Yields variant export rows for every synthetic template."""
+    variant_number = 0
+    for t in range(templates):
+        tmpl_id = f"__export__.product_template_{t}"
+        tmpl_name = f"Configurable Product {t}"
+        attribute_values = [
+            [(f"Attribute {a}", f"Value {a}-{v}") for v in range(values)]
+            for a in range(attributes)
+        ]
+        combinations = itertools.product(*attribute_values)
+        for combination in itertools.islice(combinations, variants):
+            variant_number += 1
+            raw_values = ",".join(f"{attribute}: {value}" for attribute, value in combination)
+            yield [f"__export__.product_product_{variant_number}", tmpl_id, tmpl_name, raw_values]
+
+
+def write_xlsx(file_path, header, rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(file_path)
+
+
+def build_mapping(templates, attributes, values, names, rng, share=0.5, lines=2, rules=0):
+    """
+    Assigns `lines` random components to `share` of each template's attribute
+    values, and adds `rules` random combination rules over two or three attributes.
+    """
+    mapping = bom_engine.BomMapping()
+    for t in range(templates):
+        tmpl_id = f"__export__.product_template_{t}"
+        mapping.template_names[tmpl_id] = f"Configurable Product {t}"
+        assignments = mapping.assignments(tmpl_id)
+        for a in range(attributes):
+            for v in range(values):
+                if rng.random() < share:
+                    assignments[(f"Attribute {a}", f"Value {a}-{v}")] = [
+                        bom_engine.ComponentLine(rng.choice(names), float(rng.randint(1, 10)))
+                        for _ in range(lines)
+                    ]
+        template_rules = mapping.rules(tmpl_id)
+        for _ in range(rules if attributes > 1 else 0):
+            picked = rng.sample(range(attributes), rng.randint(2, min(3, attributes)))
+            conditions = [(f"Attribute {a}", f"Value {a}-{rng.randrange(values)}") for a in picked]
+            line = bom_engine.ComponentLine(rng.choice(names), float(rng.randint(1, 10)))
+            template_rules.append(bom_engine.CombinationRule(conditions, rng.choice(bom_engine.RULE_KINDS), line))
+    return mapping
+
+
+def generate(output_dir, templates=10, attributes=3, values=5, variants=100, materials=1000,
+             seed=0, file_format="xlsx", rules=0):
+    """
+    Writes variants.<fmt>, components.<fmt> and mapping.json into output_dir and
+    returns their paths. `variants` caps the number of variants per template
+    (at most values ** attributes); `rules` is the number of combination rules
+    per template.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    names = material_names(materials, rng)
+
+    variant_path = os.path.join(output_dir, f"variants.{file_format}")
+    product_path = os.path.join(output_dir, f"components.{file_format}")
+    mapping_path = os.path.join(output_dir, "mapping.json")
+
+    variant_data = variant_rows(templates, attributes, values, variants, rng)
+    product_data = (
+        [f"__export__.product_product_rm_{i}", name, rng.choice(UOMS)] for i, name in enumerate(names)
+    )
+    if file_format == "csv":
+        for path, header, rows in ((variant_path, VARIANT_HEADER, variant_data),
+                                   (product_path, PRODUCT_HEADER, product_data)):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+    else:
+        write_xlsx(variant_path, VARIANT_HEADER, variant_data)
+        write_xlsx(product_path, PRODUCT_HEADER, product_data)
+
+    build_mapping(templates, attributes, values, names, rng, rules=rules).save(mapping_path)
+    return variant_path, product_path, mapping_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic Odoo variant/components exports.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--templates", type=int, default=10, help="Number of product templates")
+    parser.add_argument("--attributes", type=int, default=3, help="Attributes per template")
+    parser.add_argument("--values", type=int, default=5, help="Values per attribute")
+    parser.add_argument("--variants", type=int, default=100, help="Max variants per template")
+    parser.add_argument("--materials", type=int, default=1000, help="Number of raw materials")
+    parser.add_argument("--rules", type=int, default=0, help="Combination rules per template")
+    parser.add_argument("--format", dest="file_format", choices=["xlsx", "csv"], default="xlsx")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    paths = generate(
+        args.output_dir, args.templates, args.attributes, args.values, args.variants,
+        args.materials, args.seed, args.file_format, args.rules
+    )
+    for path in paths:
+        print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
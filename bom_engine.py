@@ -0,0 +1,1588 @@
+"""
+Headless BoM engine for D.U.M.B.
+
+Everything needed to turn an Odoo variant export, a components export and a
+saved mapping file into BoM import files, without any Qt dependency. The GUI
+in main.py and the command-line entry point below share this code.
+
+Usage:
+    python bom_engine.py variants.xlsx components.xlsx mapping.json -o out_dir
+    python bom_engine.py variants.xlsx components.xlsx mapping.json -o out_dir -t __export__.product_template_12
+    python bom_engine.py variants.xlsx components.xlsx mapping.json --odoo-url https://erp.example.com --odoo-db prod --odoo-user admin
+"""
+import os
+import re
+import sys
+import csv
+import json
+import stat
+import hashlib
+import tempfile
+import argparse
+import collections
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# numpy / pandas are imported by the functions that need them, so the GUI can
+# show its window before loading them (they take most of the start-up time)
+
+# ------------------ ODOO COLUMNS ------------------
+
+# Variant export
+VARIANT_COLUMN = "product_template_variant_value_ids"
+PRODUCT_GROUP_COLUMN = "product_tmpl_id/id"
+PRODUCT_GROUP_NAME_COLUMN = "product_tmpl_id/name"
+VARIANT_ID_COLUMN = "id"
+
+# Components export
+PRODUCT_COLUMN = "name"
+PRODUCT_ID_COLUMN = "id"
+UOM_COLUMN = "uom_id"
+
+# BoM import file
+BOM_FIELDNAMES = [
+    "product_tmpl_id/id",
+    "product_id/id",
+    "type",
+    "product_qty",
+    "bom_line_ids/product_id/id",
+    "bom_line_ids/product_qty",
+    "bom_line_ids/product_uom_id"
+]
+
+# Output writing
+WRITE_BATCH_ROWS = 5000
+WRITE_BUFFER_SIZE = 1024 * 1024
+PROGRESS_EVERY = 200
+
+DEFAULT_BOM_TYPE = "Manufacture this product"
+BOM_TYPES = ["Manufacture this product", "Kit"]
+
+
+# Combination rule actions, applied in this order
+RULE_ADD = "add"
+RULE_EXCLUDE = "exclude"
+RULE_QTY = "qty"
+RULE_KINDS = [RULE_ADD, RULE_EXCLUDE, RULE_QTY]
+
+
+class EngineError(Exception):
+    """Raised when input files or the mapping cannot be used to build BoMs."""
+
+
+class Cancelled(Exception):
+    """Raised when a long-running load or generation is cancelled."""
+
+
+# ------------------ PARSING ------------------
+
+def object_bytes(items):
+    """Approximate memory of a sequence of Python objects: its references plus each distinct object once."""
+    distinct = {id(item): item for item in items}
+    return 8 * len(items) + sum(sys.getsizeof(item) for item in distinct.values())
+
+
+class ProductCatalog:
+    """
+    Components export as a product name -> (product id, UoM) lookup.
+
+    Names live in a pandas Index, whose C hash table maps each name to an
+    integer code; product ids are an array indexed by that code and UoMs are
+    stored once as categories, indexed by a small integer code per product.
+    """
+
+    def __init__(self, product_data=None):
+        import pandas as pd
+        if product_data is None:
+            product_data = pd.DataFrame()
+        empty = pd.Series("", index=product_data.index, dtype=object)
+        names = product_data.get(PRODUCT_COLUMN, empty).astype(str)
+        # A name exported twice keeps its last row; such names are ambiguous (see validate_mapping)
+        keep = ~names.duplicated(keep="last").to_numpy()
+        self.names = pd.Index(names.to_numpy()[keep], dtype=object)
+        self.duplicates = pd.Index(names[~keep].unique(), dtype=object)
+        # Empty cells stay empty rather than becoming 'nan'
+        self.ids = product_data.get(PRODUCT_ID_COLUMN, empty).astype(object).fillna("").astype(str).to_numpy()[keep]
+        uoms = pd.Categorical(product_data.get(UOM_COLUMN, empty).astype(object).fillna("").astype(str).to_numpy()[keep])
+        self.uom_codes = uoms.codes
+        self.uoms = uoms.categories.tolist()
+        self._memory_bytes = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, product_name):
+        return product_name in self.names
+
+    def code(self, product_name):
+        """Integer code of a product name, or -1 if it is not in the export."""
+        try:
+            return self.names.get_loc(product_name)
+        except KeyError:
+            return -1
+
+    def get(self, product_name, default=None):
+        """Returns (product id, UoM) of a product name, or default."""
+        code = self.code(product_name)
+        if code < 0:
+            return default
+        return self.ids[code], self.uoms[self.uom_codes[code]]
+
+    def keys(self):
+        return self.names
+
+    def memory_bytes(self):
+        """Approximate memory held by the catalogue (computed once)."""
+        if self._memory_bytes is None:
+            self._memory_bytes = (
+                object_bytes(self.names) + object_bytes(self.ids) + object_bytes(self.duplicates)
+                + self.uom_codes.nbytes + object_bytes(self.uoms)
+            )
+        return self._memory_bytes
+
+
+def build_product_info_map(product_data):
+    """Returns the ProductCatalog (product_name -> (id, UoM)) of a components export."""
+    return ProductCatalog(product_data)
+
+
+def check_variant_columns(variant_data):
+    """Raises EngineError if the variant export is missing a required column."""
+    if VARIANT_COLUMN not in variant_data.columns:
+        raise EngineError(f"Column '{VARIANT_COLUMN}' not found in the variant file")
+    if VARIANT_ID_COLUMN not in variant_data.columns:
+        raise EngineError(f"Column '{VARIANT_ID_COLUMN}' (Variant ID) not found in the variant file")
+    if PRODUCT_GROUP_COLUMN not in variant_data.columns:
+        raise EngineError(f"Column '{PRODUCT_GROUP_COLUMN}' (Product Template ID) not found in the variant file")
+
+
+def parse_variant_table(variant_data):
+    """
+    Parses the 'product_template_variant_value_ids' column of a whole variant
+    export at once into a long table with one line per (variant, attribute, value).
+
+    Columns: row (position of the variant in variant_data), template,
+    attribute, value. Lines keep the order of the export and, within a
+    variant, the order of its values. Template, attribute and value are
+    categoricals, so each distinct string is stored once.
+    """
+    import numpy as np
+    import pandas as pd
+
+    variant_data = variant_data.reset_index(drop=True)
+    items = variant_data[VARIANT_COLUMN].astype(str).str.split(",").explode().str.strip()
+    items = items[items != ""]
+    parts = items.str.partition(": ").reindex(columns=[0, 1, 2], fill_value="")
+    has_attribute = parts[1] != ""
+    rows = items.index.to_numpy()
+    templates = variant_data[PRODUCT_GROUP_COLUMN].astype(str).astype("category")
+    return pd.DataFrame({
+        "row": rows.astype(np.int32),
+        "template": pd.Categorical.from_codes(templates.cat.codes.to_numpy()[rows], templates.cat.categories),
+        "attribute": pd.Categorical(parts[0].where(has_attribute, "Unknown").to_numpy()),
+        "value": pd.Categorical(parts[2].where(has_attribute, items).to_numpy()),
+    })
+
+
+class VariantIndex:
+    """
+    Variant values parsed once, with lookups from template to its variants
+    and from (attribute, value) to the variants carrying it.
+
+    Variants are addressed by their row position in the export. Only the
+    columns needed for BoMs are kept, and repeated strings (template ids,
+    attributes, values) are shared rather than copied per variant.
+    """
+
+    def __init__(self, variant_data):
+        import numpy as np
+        variant_data = variant_data.reset_index(drop=True)
+        self.values = parse_variant_table(variant_data)
+
+        # Categories are the only copies of each template id; the lists below reference them
+        templates = variant_data[PRODUCT_GROUP_COLUMN].astype(str).astype("category")
+        self.variant_ids = variant_data[VARIANT_ID_COLUMN].astype(str).tolist()
+        self.variant_templates = templates.tolist()
+        if PRODUCT_GROUP_NAME_COLUMN in variant_data.columns:
+            names = variant_data[PRODUCT_GROUP_NAME_COLUMN].astype(str)
+        else:
+            names = templates.astype(str)
+        firsts = templates.drop_duplicates()
+        # template_id -> template name, in export order
+        self.template_names = dict(zip(firsts, names[firsts.index]))
+
+        # template_id -> variant rows
+        self.template_rows = templates.groupby(templates, sort=False, observed=True).indices
+
+        # template_id -> positions in self.values
+        self.template_lines = self.values.groupby("template", sort=False, observed=True).indices
+
+        # (attribute, value) -> variant rows
+        value_rows = self.values["row"].to_numpy()
+        pair_lines = self.values.groupby(["attribute", "value"], sort=False, observed=True).indices
+        self.value_rows = {key: value_rows[positions] for key, positions in pair_lines.items()}
+
+        # Values of variant r are pairs[starts[r]:starts[r + 1]]; every line of
+        # the same (attribute, value) references one shared tuple
+        pairs = np.empty(len(self.values), dtype=object)
+        for key, positions in pair_lines.items():
+            pairs[positions] = [key] * len(positions)
+        self.pairs = pairs.tolist()
+        self.starts = value_rows.searchsorted(range(len(variant_data) + 1)).tolist()
+        # template_id -> { (attribute, value): positions in template_rows[template_id] }, built on first use
+        self.template_value_positions = {}
+        self._memory_bytes = None
+
+    def variant_values(self, row):
+        """Returns the (attribute, value) pairs of the variant at `row`."""
+        return self.pairs[self.starts[row]:self.starts[row + 1]]
+
+    def memory_bytes(self):
+        """Approximate memory held by the index (computed once)."""
+        if self._memory_bytes is None:
+            self._memory_bytes = (
+                int(self.values.memory_usage(deep=True).sum())
+                + object_bytes(self.variant_ids) + object_bytes(self.variant_templates)
+                + object_bytes(self.pairs) + object_bytes(self.starts)
+                + sum(rows.nbytes for rows in self.template_rows.values())
+                + sum(rows.nbytes for rows in self.value_rows.values())
+                + sum(lines.nbytes for lines in self.template_lines.values())
+            )
+        return self._memory_bytes
+
+    def value_positions(self, tmpl_id):
+        """
+        Returns { (attribute, value): positions in template_rows[tmpl_id] } of
+        the template's variants carrying each value, in export order. Computed
+        from the template's own lines once, so its cost does not depend on how
+        many other templates share the values.
+        """
+        import numpy as np
+        positions = self.template_value_positions.get(tmpl_id)
+        if positions is None:
+            positions = {}
+            lines = self.template_lines.get(tmpl_id)
+            if lines is not None and len(lines):
+                attributes = self.values["attribute"].cat
+                values = self.values["value"].cat
+                keys = (attributes.codes.to_numpy()[lines].astype(np.int64) * len(values.categories)
+                        + values.codes.to_numpy()[lines])
+                order = np.argsort(keys, kind="stable")
+                lines, keys = lines[order], keys[order]
+                # Lines are in row order, so each value's positions stay sorted
+                local = np.searchsorted(self.template_rows[tmpl_id], self.values["row"].to_numpy()[lines])
+                splits = np.flatnonzero(np.diff(keys)) + 1
+                groups = sorted(zip(lines[np.concatenate(([0], splits))].tolist(), np.split(local, splits)),
+                                key=lambda group: group[0])
+                for first_line, group in groups:
+                    positions[self.pairs[first_line]] = group
+            self.template_value_positions[tmpl_id] = positions
+        return positions
+
+    def template_attributes(self, tmpl_id):
+        """Returns { attribute: [values in export order] } for one template."""
+        attributes = {}
+        for attribute, value in self.value_positions(tmpl_id):
+            attributes.setdefault(attribute, []).append(value)
+        return attributes
+
+    def iter_variants(self, tmpl_id):
+        """Yields (template_id, variant_id, [(attribute, value), ...]) for one template."""
+        for row in self.template_rows.get(tmpl_id, ()):
+            yield self.variant_templates[row], self.variant_ids[row], self.variant_values(row)
+
+
+# ------------------ EXPORT CHANGES ------------------
+
+def diff_variants(old, new):
+    """
+    Compares two VariantIndexes of the same export by variant id, e.g. before
+    and after the file changed on disk. A variant is changed when its template
+    or its values differ. Returns
+    { 'added': [...], 'removed': [...], 'changed': [variant ids],
+      'templates': {template ids whose variants or name changed} }.
+    """
+    old_rows = {variant_id: row for row, variant_id in enumerate(old.variant_ids)}
+    added, changed, templates = [], [], set()
+    for row, variant_id in enumerate(new.variant_ids):
+        tmpl_id = new.variant_templates[row]
+        old_row = old_rows.pop(variant_id, None)
+        if old_row is None:
+            added.append(variant_id)
+            templates.add(tmpl_id)
+        elif old.variant_templates[old_row] != tmpl_id or old.variant_values(old_row) != new.variant_values(row):
+            changed.append(variant_id)
+            templates.update((tmpl_id, old.variant_templates[old_row]))
+    # Variants left over were not in the new export
+    removed = list(old_rows)
+    templates.update(old.variant_templates[row] for row in old_rows.values())
+    templates.update(
+        tmpl_id for tmpl_id in set(old.template_names) | set(new.template_names)
+        if old.template_names.get(tmpl_id) != new.template_names.get(tmpl_id)
+    )
+    return {"added": added, "removed": removed, "changed": changed, "templates": templates}
+
+
+def diff_catalogs(old, new):
+    """
+    Compares two ProductCatalogs by product name. A product is changed when its
+    id or UoM differ. Returns { 'added': [...], 'removed': [...], 'changed': [names] }.
+    """
+    import numpy as np
+    common = new.names.intersection(old.names)
+    old_codes = old.names.get_indexer(common)
+    new_codes = new.names.get_indexer(common)
+    old_uoms = np.asarray(old.uoms, dtype=object)[old.uom_codes[old_codes]]
+    new_uoms = np.asarray(new.uoms, dtype=object)[new.uom_codes[new_codes]]
+    differs = (old.ids[old_codes] != new.ids[new_codes]) | (old_uoms != new_uoms)
+    return {
+        "added": new.names.difference(old.names).tolist(),
+        "removed": old.names.difference(new.names).tolist(),
+        "changed": common[differs].tolist(),
+    }
+
+
+def describe_changes(changes, noun):
+    """'3 added, 1 removed, 2 changed variants' (or 'no changed variants')."""
+    parts = [f"{len(changes[kind])} {kind}" for kind in ("added", "removed", "changed") if changes[kind]]
+    return f"{', '.join(parts)} {noun}" if parts else f"no changed {noun}"
+
+
+# ------------------ MAPPING ------------------
+
+class ComponentLine:
+    """
+    One component assigned to an (attribute, value): the product picked by the
+    user, its quantity, and the Odoo product / UoM ids resolved from the
+    components export when the line was last edited.
+    """
+    __slots__ = ("product_name", "qty", "product_id", "uom_id")
+
+    def __init__(self, product_name, qty=1.0, product_id="", uom_id=""):
+        self.product_name = product_name
+        self.qty = qty
+        self.product_id = product_id
+        self.uom_id = uom_id
+
+    def resolve(self, product_info_map):
+        """Looks up the product and UoM ids of product_name in a ProductCatalog."""
+        self.product_id, self.uom_id = product_info_map.get(self.product_name, ("", ""))
+
+    def __repr__(self):
+        return f"ComponentLine({self.product_name!r}, {self.qty!r})"
+
+
+class CombinationRule:
+    """
+    Components that depend on several attribute values at once. A variant that
+    has every (attribute, value) in `conditions` gets `line` added (add), loses
+    every line of line.product_name (exclude), or has the quantity of those
+    lines set to line.qty (qty).
+    """
+    __slots__ = ("conditions", "kind", "line")
+
+    def __init__(self, conditions, kind, line):
+        if kind not in RULE_KINDS:
+            raise EngineError(f"Unknown rule action '{kind}'")
+        self.conditions = [tuple(c) for c in conditions]
+        self.kind = kind
+        self.line = line
+
+    def describe(self):
+        """'Size = L AND Material = Oak'."""
+        return " AND ".join(f"{attribute} = {value}" for attribute, value in self.conditions) or "(every variant)"
+
+    def __repr__(self):
+        return f"CombinationRule({self.conditions!r}, {self.kind!r}, {self.line!r})"
+
+
+class BomMapping:
+    """
+    Component assignments of every template:
+    template_id -> { (attribute, value): [ComponentLine, ...] }.
+
+    Templates can also have CombinationRules: template_id -> [CombinationRule, ...].
+    Components named in `subassemblies` are manufactured sub-assemblies: variants
+    with a BoM of their own (see BomExpander).
+
+    The GUI edits it and BoM generation only reads from it. It is saved as
+    JSON of the form:
+        {"templates": {"<product_tmpl_id/id>": {"name": "...", "assignments": [
+            {"attribute": "Size", "value": "L",
+             "components": [{"product": "Screw M4", "qty": 2.0}]}],
+            "rules": [{"when": [{"attribute": "Size", "value": "L"},
+                                {"attribute": "Material", "value": "Oak"}],
+                       "action": "add", "product": "Bracket X", "qty": 2.0}]}},
+         "subassemblies": ["Drawer Oak L"]}
+    """
+
+    def __init__(self):
+        self.templates = {}
+        self.template_names = {}
+        self.template_rules = {}
+        self.subassemblies = set()
+
+    def assignments(self, tmpl_id):
+        """Returns (creating it if needed) the assignments of one template."""
+        return self.templates.setdefault(tmpl_id, {})
+
+    def rules(self, tmpl_id):
+        """Returns (creating it if needed) the combination rules of one template."""
+        self.assignments(tmpl_id)
+        return self.template_rules.setdefault(tmpl_id, [])
+
+    def iter_lines(self):
+        """Yields every ComponentLine, of the assignments and of the rules."""
+        for assignments in self.templates.values():
+            for lines in assignments.values():
+                yield from lines
+        for rules in self.template_rules.values():
+            for rule in rules:
+                yield rule.line
+
+    def resolve(self, product_info_map):
+        """Resolves the product / UoM ids of every line, e.g. after loading a components file."""
+        for line in self.iter_lines():
+            line.resolve(product_info_map)
+
+    def save(self, file_path):
+        templates = {}
+        for tmpl_id, assignments in self.templates.items():
+            entries = [
+                {
+                    "attribute": attribute,
+                    "value": value,
+                    "components": [{"product": line.product_name, "qty": line.qty} for line in lines],
+                }
+                for (attribute, value), lines in assignments.items() if lines
+            ]
+            rules = [
+                {
+                    "when": [{"attribute": attribute, "value": value} for attribute, value in rule.conditions],
+                    "action": rule.kind,
+                    "product": rule.line.product_name,
+                    "qty": rule.line.qty,
+                }
+                for rule in self.template_rules.get(tmpl_id, ())
+            ]
+            if entries or rules:
+                templates[tmpl_id] = {"name": self.template_names.get(tmpl_id, ""), "assignments": entries}
+                if rules:
+                    templates[tmpl_id]["rules"] = rules
+        data = {"templates": templates}
+        if self.subassemblies:
+            data["subassemblies"] = sorted(self.subassemblies)
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, file_path):
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise EngineError(f"Cannot read mapping file '{file_path}': {e}")
+
+        mapping = cls()
+        try:
+            for tmpl_id, template in data.get("templates", {}).items():
+                assignments = mapping.assignments(tmpl_id)
+                if template.get("name"):
+                    mapping.template_names[tmpl_id] = template["name"]
+                for entry in template.get("assignments", []):
+                    key = (str(entry["attribute"]), str(entry["value"]))
+                    lines = assignments.setdefault(key, [])
+                    for comp in entry.get("components", []):
+                        lines.append(ComponentLine(str(comp["product"]), float(comp.get("qty", 1.0))))
+                for entry in template.get("rules", []):
+                    conditions = [(str(c["attribute"]), str(c["value"])) for c in entry.get("when", [])]
+                    line = ComponentLine(str(entry["product"]), float(entry.get("qty", 1.0)))
+                    mapping.rules(tmpl_id).append(CombinationRule(conditions, entry.get("action", RULE_ADD), line))
+            mapping.subassemblies.update(str(name) for name in data.get("subassemblies", []))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise EngineError(f"Invalid mapping file '{file_path}': {e}")
+        return mapping
+
+
+def load_mapping(file_path, product_info_map):
+    """Reads a saved mapping file and resolves its lines against a components lookup."""
+    mapping = BomMapping.load(file_path)
+    mapping.resolve(product_info_map)
+    return mapping
+
+
+# ------------------ COMBINATION RULES ------------------
+
+class TemplateRules:
+    """
+    The combination rules of one template, matched against all its variants.
+
+    Each (attribute, value) in a condition becomes a boolean mask over the
+    template's variants and each rule the AND of its masks, so matching
+    thousands of rules costs a few vector operations per rule instead of a
+    loop over variants. Only the resulting per-variant rule lists are kept.
+    """
+
+    def __init__(self, variant_index, tmpl_id, rules):
+        import numpy as np
+        # variant_id -> matching rules, in the order they are applied
+        self.matches = {}
+        rows = variant_index.template_rows.get(tmpl_id)
+        if not rules or rows is None or not len(rows):
+            return
+
+        # Adds first, then exclusions, then quantity overrides; among those,
+        # more specific rules come later so they win
+        order = sorted(
+            range(len(rules)),
+            key=lambda i: (RULE_KINDS.index(rules[i].kind), len(rules[i].conditions), i)
+        )
+        ordered = [rules[i] for i in order]
+
+        masks = {}
+        value_positions = variant_index.value_positions(tmpl_id)
+
+        def value_mask(key):
+            mask = masks.get(key)
+            if mask is None:
+                mask = np.zeros(len(rows), dtype=bool)
+                positions = value_positions.get(key)
+                if positions is not None:
+                    mask[positions] = True
+                masks[key] = mask
+            return mask
+
+        matched = np.ones((len(ordered), len(rows)), dtype=bool)
+        for i, rule in enumerate(ordered):
+            for key in rule.conditions:
+                matched[i] &= value_mask(key)
+
+        # (variant position, rule position) pairs, grouped by variant
+        variant_positions, rule_positions = np.nonzero(matched.T)
+        if not len(variant_positions):
+            return
+        splits = np.flatnonzero(np.diff(variant_positions)) + 1
+        starts = np.concatenate(([0], splits))
+        variant_ids = variant_index.variant_ids
+        for start, group in zip(starts.tolist(), np.split(rule_positions, splits)):
+            row = rows[variant_positions[start]]
+            self.matches[variant_ids[row]] = [ordered[i] for i in group.tolist()]
+
+    def apply(self, variant_id, components):
+        """Returns the variant's component lines after its matching rules."""
+        rules = self.matches.get(variant_id)
+        if not rules:
+            return components
+        components = list(components)
+        for rule in rules:
+            product_name = rule.line.product_name
+            if rule.kind == RULE_ADD:
+                components.append(rule.line)
+            elif rule.kind == RULE_EXCLUDE:
+                components = [line for line in components if line.product_name != product_name]
+            else:
+                # Lines are shared between variants: override on a copy
+                components = [
+                    ComponentLine(line.product_name, rule.line.qty, line.product_id, line.uom_id)
+                    if line.product_name == product_name else line
+                    for line in components
+                ]
+        return components
+
+
+# ------------------ MULTI-LEVEL BOMS ------------------
+
+# Raw-material requirements file
+REQUIREMENT_FIELDNAMES = ["product_id/id", "component", "component_id", "qty", "uom"]
+
+
+class BomExpander:
+    """
+    Expands BoMs through sub-assemblies: components marked in the mapping as
+    manufactured sub-assemblies whose product id is a variant of the variant
+    export, with a BoM of its own.
+
+    A variant's components depend only on its template and its attribute
+    values, so they (and its flattened raw materials) are computed once per
+    (template, values) key and shared by every variant with that key. Each
+    distinct key is expanded once, so deep, shared sub-assembly trees resolve
+    in time linear in the number of keys and component lines.
+    """
+
+    def __init__(self, variant_index, mapping, product_qty=1.0):
+        self.variant_index = variant_index
+        self.mapping = mapping
+        self.product_qty = float(product_qty)
+        # Sub-assembly product id -> its variant row
+        self.variant_rows = {variant_id: row for row, variant_id in enumerate(variant_index.variant_ids)}
+        self.template_rules = {}
+        # (template, values) key -> component lines, sub-assembly rows, raw materials
+        self.lines = {}
+        self.children = {}
+        self.raw_materials = {}
+        # Marked sub-assemblies that are not variants of the export (used as plain components)
+        self.unresolved = set()
+
+    def key(self, row):
+        return self.variant_index.variant_templates[row], tuple(self.variant_index.variant_values(row))
+
+    def components(self, row):
+        """Component lines of the variant at row, with its template's rules applied."""
+        key = self.key(row)
+        lines = self.lines.get(key)
+        if lines is None:
+            tmpl_id, values = key
+            assignments = self.mapping.templates.get(tmpl_id, {})
+            lines = []
+            for value in values:
+                lines.extend(assignments.get(value, ()))
+            rules = self.template_rules.get(tmpl_id)
+            if rules is None:
+                rules = self.template_rules[tmpl_id] = TemplateRules(
+                    self.variant_index, tmpl_id, self.mapping.template_rules.get(tmpl_id)
+                )
+            lines = rules.apply(self.variant_index.variant_ids[row], lines)
+            self.lines[key] = lines
+        return lines
+
+    def subassembly_row(self, line):
+        """Variant row a line's sub-assembly is made as, or None for a bought component."""
+        if line.product_name not in self.mapping.subassemblies:
+            return None
+        row = self.variant_rows.get(line.product_id)
+        if row is None:
+            self.unresolved.add(line.product_name)
+            return None
+        # A sub-assembly without components of its own has no BoM: it is bought
+        return row if self.components(row) else None
+
+    def child_rows(self, row):
+        """Rows of the sub-assemblies in the BoM of the variant at row, each once."""
+        key = self.key(row)
+        rows = self.children.get(key)
+        if rows is None:
+            rows = []
+            for line in self.components(row):
+                child = self.subassembly_row(line)
+                if child is not None and child not in rows:
+                    rows.append(child)
+            self.children[key] = rows
+        return rows
+
+    def ordered_rows(self, rows):
+        """
+        The given variant rows and every sub-assembly variant below them, each
+        once, sub-assemblies before the BoMs using them. Raises EngineError
+        when sub-assemblies form a cycle.
+        """
+        order = []
+        # row -> True while on the current path, False once done
+        open_rows = {}
+        for root in rows:
+            if root in open_rows:
+                continue
+            open_rows[root] = True
+            stack = [(root, iter(self.child_rows(root)))]
+            while stack:
+                row, children = stack[-1]
+                for child in children:
+                    state = open_rows.get(child)
+                    if state is None:
+                        open_rows[child] = True
+                        stack.append((child, iter(self.child_rows(child))))
+                        break
+                    if state:
+                        path = [r for r, _ in stack]
+                        cycle = path[path.index(child):] + [child]
+                        raise EngineError(
+                            "Sub-assembly cycle: "
+                            + " -> ".join(self.variant_index.variant_ids[r] for r in cycle)
+                        )
+                else:
+                    stack.pop()
+                    open_rows[row] = False
+                    order.append(row)
+        return order
+
+    def template_order(self, templates):
+        """
+        The given templates and those of their sub-assemblies, sub-assembly
+        templates first where the templates themselves allow it.
+        """
+        templates = list(templates)
+        rows = [row for tmpl_id in templates for row in self.variant_index.template_rows.get(tmpl_id, ())]
+        appearance = {}
+        uses = {}
+        for row in self.ordered_rows(rows):
+            tmpl_id = self.variant_index.variant_templates[row]
+            appearance.setdefault(tmpl_id, len(appearance))
+            for child in self.child_rows(row):
+                child_tmpl = self.variant_index.variant_templates[child]
+                if child_tmpl != tmpl_id:
+                    uses.setdefault(tmpl_id, set()).add(child_tmpl)
+        for tmpl_id in templates:
+            appearance.setdefault(tmpl_id, len(appearance))
+        order, done = [], set()
+        pending = sorted(appearance, key=appearance.get)
+        while pending:
+            ready = [t for t in pending if uses.get(t, set()) <= done] or pending[:1]
+            for tmpl_id in ready:
+                order.append(tmpl_id)
+                done.add(tmpl_id)
+            pending = [t for t in pending if t not in done]
+        return order
+
+    def iter_bom_rows(self, rows, bom_type, progress=None, is_cancelled=None):
+        """
+        BoM rows of the variants at rows and of every sub-assembly below them,
+        sub-assemblies first. progress / is_cancelled work as in track_progress.
+        """
+        variant_index = self.variant_index
+        ordered = self.ordered_rows(rows)
+        for row in track_progress(ordered, len(ordered), progress, is_cancelled):
+            yield from bom_block_rows(variant_index.variant_templates[row], variant_index.variant_ids[row],
+                                      self.components(row), self.product_qty, bom_type)
+
+    def requirements(self, rows):
+        """
+        Yields (variant_id, {(component, component_id, uom): qty}) for the
+        given rows: the bought components and raw materials of one BoM, with
+        every sub-assembly replaced by its own requirements scaled by its qty.
+        """
+        rows = list(rows)
+        for row in self.ordered_rows(rows):
+            key = self.key(row)
+            if key not in self.raw_materials:
+                totals = {}
+                for line in self.components(row):
+                    child = self.subassembly_row(line)
+                    if child is None:
+                        item = (line.product_name, line.product_id, line.uom_id)
+                        totals[item] = totals.get(item, 0.0) + line.qty
+                        continue
+                    # A sub-assembly BoM makes product_qty units
+                    scale = line.qty / self.product_qty
+                    for item, qty in self.raw_materials[self.key(child)].items():
+                        totals[item] = totals.get(item, 0.0) + qty * scale
+                self.raw_materials[key] = totals
+        for row in rows:
+            yield self.variant_index.variant_ids[row], self.raw_materials[self.key(row)]
+
+
+def requirements_path(file_path):
+    """'boms.csv' -> 'boms_raw_materials.csv'."""
+    return os.path.splitext(file_path)[0] + "_raw_materials.csv"
+
+
+def write_requirements_csv(file_path, requirements):
+    """
+    Writes flattened raw-material requirements, as yielded by
+    BomExpander.requirements, to a CSV file; returns the number of variants.
+    """
+    count = 0
+
+    def write(f):
+        nonlocal count
+        writer = csv.writer(f)
+        writer.writerow(REQUIREMENT_FIELDNAMES)
+        for variant_id, totals in requirements:
+            count += 1
+            writer.writerows(
+                [variant_id, name, product_id, round(qty, 6), uom_id]
+                for (name, product_id, uom_id), qty in totals.items()
+            )
+
+    _write_atomic(file_path, write, buffering=WRITE_BUFFER_SIZE)
+    return count
+
+
+# ------------------ VALIDATION ------------------
+
+# Issue kinds: (attribute of MappingIssues, label, blocks a correct export)
+ISSUE_KINDS = [
+    ("unknown", "unknown component(s)", True),
+    ("ambiguous", "ambiguous component name(s)", True),
+    ("missing_id", "component(s) without product id", True),
+    ("missing_uom", "component(s) without UoM", True),
+    ("subassembly", "sub-assembly(ies) not in the variant export", False),
+    ("unmapped", "attribute value(s) without components", False),
+    ("uncovered", "variant(s) without any component", False),
+]
+
+
+class MappingIssues:
+    """
+    Problems found by MappingValidator. Each kind is a list of
+    (template_id, detail): a product name, an (attribute, value) or a variant id.
+    """
+
+    def __init__(self):
+        for kind, _, _ in ISSUE_KINDS:
+            setattr(self, kind, [])
+
+    def count(self):
+        return sum(len(getattr(self, kind)) for kind, _, _ in ISSUE_KINDS)
+
+    def has_errors(self):
+        """True when the export would contain empty product ids or UoMs, or a guessed product."""
+        return any(getattr(self, kind) for kind, _, blocking in ISSUE_KINDS if blocking)
+
+    def summary(self):
+        """'2 unknown component(s), 5 variant(s) without any component' (or '')."""
+        return ", ".join(
+            f"{len(getattr(self, kind))} {label}" for kind, label, _ in ISSUE_KINDS if getattr(self, kind)
+        )
+
+    def details(self, shown=10):
+        """One block per kind, listing the first `shown` issues."""
+        blocks = []
+        for kind, label, _ in ISSUE_KINDS:
+            issues = getattr(self, kind)
+            if not issues:
+                continue
+            lines = [f"{len(issues)} {label}:"]
+            for tmpl_id, detail in issues[:shown]:
+                if isinstance(detail, tuple):
+                    detail = f"{detail[0]} = {detail[1]}"
+                elif not detail:
+                    detail = "<no product>"
+                lines.append(f"  {detail}  ({tmpl_id})" if tmpl_id else f"  {detail}")
+            if len(issues) > shown:
+                lines.append(f"  ... and {len(issues) - shown} more")
+            blocks.append("\n".join(lines))
+        return "\n".join(blocks)
+
+
+class MappingValidator:
+    """
+    Checks a BomMapping against the variant and components exports before
+    export: unknown or ambiguous (exported more than once) component names,
+    components without product id or UoM, marked sub-assemblies that are not variants,
+    attribute values without components and variants that would get no BoM.
+
+    Component names of the checked templates are looked up in one hash join
+    against the catalogue, and variant coverage is a boolean mask over each
+    template's variants filled from its own (attribute, value) -> positions
+    lookup, so checking a template costs a few array operations over its own
+    variants: the GUI checks the edited template as the user types, and the
+    whole mapping once before a batch export. Per-template data from the
+    variant export is computed once.
+    """
+
+    def __init__(self, variant_index):
+        self.variant_index = variant_index
+        self.variant_ids = set(variant_index.variant_ids)
+        # template -> its distinct (attribute, value) pairs
+        self.template_pairs = {}
+        # template -> (conditions of its 'add' rules, variant ids they give a component)
+        self.rule_coverage = {}
+
+    def pairs(self, tmpl_id):
+        pairs = self.template_pairs.get(tmpl_id)
+        if pairs is None:
+            pairs = self.template_pairs[tmpl_id] = [
+                (attribute, value)
+                for attribute, values in self.variant_index.template_attributes(tmpl_id).items()
+                for value in values
+            ]
+        return pairs
+
+    def added_by_rules(self, tmpl_id, rules):
+        """Ids of the variants an 'add' rule gives a component; rematched only when those rules change."""
+        conditions = tuple(tuple(rule.conditions) for rule in rules if rule.kind == RULE_ADD)
+        cached = self.rule_coverage.get(tmpl_id)
+        if cached is None or cached[0] != conditions:
+            adds = [rule for rule in rules if rule.kind == RULE_ADD]
+            cached = self.rule_coverage[tmpl_id] = (
+                conditions, set(TemplateRules(self.variant_index, tmpl_id, adds).matches)
+            )
+        return cached[1]
+
+    def validate(self, mapping, product_info_map, templates=None):
+        """
+        Returns the MappingIssues of the given templates (default: every template
+        with components or rules in the mapping). Component checks are skipped
+        while no components export is loaded (product_info_map not a ProductCatalog).
+        """
+        import numpy as np
+        import pandas as pd
+        issues = MappingIssues()
+        if templates is None:
+            templates = [
+                t for t, assignments in mapping.templates.items()
+                if any(assignments.values()) or mapping.template_rules.get(t)
+            ]
+
+        # ---- components: one join of every line's product against the catalogue
+        if isinstance(product_info_map, ProductCatalog):
+            line_templates, line_names = [], []
+            for tmpl_id in templates:
+                for lines in mapping.templates.get(tmpl_id, {}).values():
+                    for line in lines:
+                        line_templates.append(tmpl_id)
+                        line_names.append(line.product_name)
+                for rule in mapping.template_rules.get(tmpl_id, ()):
+                    line_templates.append(tmpl_id)
+                    line_names.append(rule.line.product_name)
+            lines = pd.DataFrame({"template": line_templates, "product": line_names}).drop_duplicates()
+            codes = product_info_map.names.get_indexer(lines["product"])
+            known = codes >= 0
+            # Empty id / UoM cells of the products found
+            missing_id = known.copy()
+            missing_id[known] = product_info_map.ids[codes[known]] == ""
+            missing_uom = known.copy()
+            uoms = np.asarray(product_info_map.uoms, dtype=object)
+            missing_uom[known] = uoms[product_info_map.uom_codes[codes[known]]] == ""
+            for kind, mask in (
+                ("unknown", ~known),
+                ("ambiguous", lines["product"].isin(product_info_map.duplicates).to_numpy()),
+                ("missing_id", missing_id),
+                ("missing_uom", missing_uom),
+            ):
+                getattr(issues, kind).extend(zip(lines["template"][mask], lines["product"][mask]))
+
+            products = set(line_names)
+            for name in sorted(mapping.subassemblies & products):
+                product_id = product_info_map.get(name, ("", ""))[0]
+                if product_id not in self.variant_ids:
+                    issues.subassembly.append(("", name))
+
+        # ---- attribute values and variants, per template
+        for tmpl_id in templates:
+            assignments = mapping.templates.get(tmpl_id, {})
+            pairs = self.pairs(tmpl_id)
+            mapped = [pair for pair in pairs if assignments.get(pair)]
+            issues.unmapped.extend((tmpl_id, pair) for pair in pairs if not assignments.get(pair))
+
+            rows = self.variant_index.template_rows.get(tmpl_id)
+            if rows is None or not len(rows):
+                continue
+            value_positions = self.variant_index.value_positions(tmpl_id)
+            covered = np.zeros(len(rows), dtype=bool)
+            for pair in mapped:
+                covered[value_positions[pair]] = True
+            uncovered = rows[~covered]
+            if not len(uncovered):
+                continue
+            uncovered_ids = [self.variant_index.variant_ids[row] for row in uncovered.tolist()]
+            rules = mapping.template_rules.get(tmpl_id)
+            if rules:
+                # Variants given a component by an 'add' rule are covered too
+                added = self.added_by_rules(tmpl_id, rules)
+                uncovered_ids = [variant_id for variant_id in uncovered_ids if variant_id not in added]
+            issues.uncovered.extend((tmpl_id, variant_id) for variant_id in uncovered_ids)
+        return issues
+
+
+# ------------------ BOM ROWS ------------------
+
+def iter_bom_rows(variants, assignments, product_qty, bom_type, rules=None):
+    """
+    Yields BoM rows (lists in BOM_FIELDNAMES order) for the given variants.
+
+    variants is an iterable of (template_id, variant_id, [(attribute, value), ...]),
+    as produced by VariantIndex.iter_variants.
+    assignments maps (attribute, value) -> [ComponentLine, ...] with resolved ids.
+    rules (a TemplateRules) adds, removes or re-quantifies components for
+    variants matching a combination of values.
+    The first component row of each BoM carries the header info; subsequent
+    component rows have empty header columns. Variants without any assigned
+    component are skipped.
+    """
+    for tmpl_id, variant_id, av_pairs in variants:
+        # Gather all components
+        all_components = []
+        for av_pair in av_pairs:
+            all_components.extend(assignments.get(av_pair, ()))
+
+        if rules is not None:
+            all_components = rules.apply(variant_id, all_components)
+
+        yield from bom_block_rows(tmpl_id, variant_id, all_components, product_qty, bom_type)
+
+
+def bom_block_rows(tmpl_id, variant_id, lines, product_qty, bom_type):
+    """The rows of one BoM: header info on the first component row only. No rows without components."""
+    first_line = True
+    for line in lines:
+        if first_line:
+            yield [str(tmpl_id), str(variant_id), bom_type, product_qty,
+                   line.product_id, line.qty, line.uom_id]
+            first_line = False
+        else:
+            yield ["", "", "", "", line.product_id, line.qty, line.uom_id]
+
+
+def track_progress(items, total, progress=None, is_cancelled=None, every=PROGRESS_EVERY):
+    """
+    Passes items through, calling progress(done, total) every `every` items and
+    raising Cancelled as soon as is_cancelled() returns True.
+    """
+    progress = progress or (lambda done, total: None)
+    is_cancelled = is_cancelled or (lambda: False)
+    done = 0
+    for item in items:
+        yield item
+        done += 1
+        if done % every == 0:
+            if is_cancelled():
+                raise Cancelled()
+            progress(done, total)
+    progress(done, total)
+
+
+# Mode of new output files: 0666 minus the umask, read once
+_new_file_mode = None
+
+
+def _file_mode(file_path):
+    """Mode for file_path: the mode of the file it replaces, or that of a file created by open()."""
+    global _new_file_mode
+    try:
+        return stat.S_IMODE(os.stat(file_path).st_mode)
+    except OSError:
+        pass
+    if _new_file_mode is None:
+        # The umask can only be read by setting it
+        umask = os.umask(0o022)
+        os.umask(umask)
+        _new_file_mode = 0o666 & ~umask
+    return _new_file_mode
+
+
+def _write_atomic(file_path, write, buffering=-1, binary=False):
+    """
+    Calls write(f) on a temporary file next to file_path, which replaces
+    file_path only once write returns: a failed or cancelled run never leaves
+    a half-written file. The file gets the permissions a plain open() would
+    give it, or keeps those of the file it replaces.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".bom-", suffix=".tmp", dir=directory)
+    try:
+        if binary:
+            f = open(fd, mode="wb", buffering=buffering)
+        else:
+            f = open(fd, mode="w", newline="", encoding="utf-8", buffering=buffering)
+        with f:
+            write(f)
+        # mkstemp creates the file as 0600
+        os.chmod(tmp_path, _file_mode(file_path))
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_bom_csv(file_path, rows):
+    """
+    Writes BoM rows to a CSV file (atomically) and returns the number of BoMs
+    written. Rows are written in batches through a large buffer.
+    """
+    bom_count = 0
+
+    def write(f):
+        nonlocal bom_count
+        writer = csv.writer(f)
+        writer.writerow(BOM_FIELDNAMES)
+        batch = []
+        for row in rows:
+            if row[0]:
+                bom_count += 1
+            batch.append(row)
+            if len(batch) >= WRITE_BATCH_ROWS:
+                writer.writerows(batch)
+                batch.clear()
+        writer.writerows(batch)
+
+    _write_atomic(file_path, write, buffering=WRITE_BUFFER_SIZE)
+    return bom_count
+
+
+def write_bom_xlsx(file_path, rows):
+    """
+    Writes BoM rows to an XLSX workbook (atomically) and returns the number of
+    BoMs written. openpyxl's write-only mode streams rows to disk, so memory
+    does not grow with the size of the export.
+    """
+    from openpyxl import Workbook
+
+    bom_count = 0
+
+    def write(f):
+        nonlocal bom_count
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("BoMs")
+        ws.append(BOM_FIELDNAMES)
+        for row in rows:
+            if row[0]:
+                bom_count += 1
+            # Empty header columns of follow-up lines are left blank
+            ws.append([None if cell == "" else cell for cell in row])
+        wb.save(f)
+
+    _write_atomic(file_path, write, buffering=WRITE_BUFFER_SIZE, binary=True)
+    return bom_count
+
+
+def write_bom_file(file_path, rows):
+    """Writes BoM rows as XLSX or CSV depending on file_path's extension; returns the BoM count."""
+    if file_path.lower().endswith(".xlsx"):
+        return write_bom_xlsx(file_path, rows)
+    return write_bom_csv(file_path, rows)
+
+
+# ------------------ CHUNKED OUTPUT ------------------
+
+def chunk_path(file_path, number):
+    """Numbered part of a chunked export: 'boms.csv' -> 'boms_001.csv'."""
+    stem, ext = os.path.splitext(file_path)
+    return f"{stem}_{number:03d}{ext}"
+
+
+def existing_chunks(file_path):
+    """Numbered parts of an earlier chunked export to file_path found on disk."""
+    directory, name = os.path.split(file_path)
+    stem, ext = os.path.splitext(name)
+    pattern = re.compile(re.escape(stem) + r"_\d{3,}" + re.escape(ext) + "$")
+    try:
+        names = os.listdir(directory or ".")
+    except OSError:
+        return []
+    return sorted(os.path.join(directory, n) for n in names if pattern.match(n))
+
+
+def iter_bom_chunks(rows, chunk_boms):
+    """Groups BoM rows into lists holding `chunk_boms` whole BoMs each (header plus lines)."""
+    chunk = []
+    bom_count = 0
+    for row in rows:
+        if row[0]:
+            if bom_count == chunk_boms:
+                yield chunk
+                chunk = []
+                bom_count = 0
+            bom_count += 1
+        chunk.append(row)
+    if chunk:
+        yield chunk
+
+
+def write_bom_chunks(file_path, rows, chunk_boms, workers=None):
+    """
+    Writes BoM rows to numbered files of at most chunk_boms BoMs each
+    ('boms.csv' -> 'boms_001.csv', 'boms_002.csv', ...), never splitting a BoM
+    across files.
+
+    Chunks are handed to a pool of `workers` processes (default: CPU count)
+    as soon as they are complete, so files are written in parallel while the
+    next ones are generated; workers=1 writes them in this process. If the run
+    fails or is cancelled, the chunks it wrote are removed; once it succeeds,
+    the chunks of an earlier, longer export to the same name are removed, so
+    the folder only holds this export.
+
+    Returns (bom_count, paths).
+    """
+    paths = []
+    bom_count = 0
+    try:
+        if workers == 1:
+            for number, chunk in enumerate(iter_bom_chunks(rows, chunk_boms), 1):
+                paths.append(chunk_path(file_path, number))
+                bom_count += write_bom_file(paths[-1], chunk)
+        else:
+            max_workers = workers or os.cpu_count() or 1
+            # Spawned, not forked: the caller may be a thread of the GUI
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+                pending = collections.deque()
+                try:
+                    for number, chunk in enumerate(iter_bom_chunks(rows, chunk_boms), 1):
+                        paths.append(chunk_path(file_path, number))
+                        pending.append(pool.submit(write_bom_file, paths[-1], chunk))
+                        # Bound the number of generated chunks waiting in memory
+                        while len(pending) > 2 * max_workers:
+                            bom_count += pending.popleft().result()
+                    while pending:
+                        bom_count += pending.popleft().result()
+                except BaseException:
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    raise
+        if not paths:
+            paths.append(chunk_path(file_path, 1))
+            write_bom_file(paths[-1], [])
+    except BaseException:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise
+    written = set(paths)
+    for path in existing_chunks(file_path):
+        if path not in written:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return bom_count, paths
+
+
+# ------------------ DELTA EXPORT ------------------
+
+def manifest_path(file_path):
+    """Manifest stored next to an export: 'boms.csv' -> 'boms.manifest.json'."""
+    return os.path.splitext(file_path)[0] + ".manifest.json"
+
+
+def removed_list_path(file_path):
+    """List of variants whose BoM should be removed: 'boms.csv' -> 'boms_removed.csv'."""
+    return os.path.splitext(file_path)[0] + "_removed.csv"
+
+
+def iter_bom_blocks(rows):
+    """Groups BoM rows into (variant_id, [rows]) blocks, one per BoM."""
+    block = []
+    for row in rows:
+        if row[0] and block:
+            yield block[0][1], block
+            block = []
+        block.append(row)
+    if block:
+        yield block[0][1], block
+
+
+def bom_block_hash(block):
+    """Content hash of one BoM (its header and all its lines), as written to the CSV."""
+    digest = hashlib.blake2b(digest_size=16)
+    for row in block:
+        digest.update("\x1f".join(str(cell) for cell in row).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def read_manifest(file_path):
+    """
+    Returns variant_id -> BoM hash of a previous export, read from its
+    .json manifest. A delta or chunked export only holds part of the BoMs,
+    so the manifest of the whole export is used whenever there is one, also
+    when one of its files ('boms.csv', 'boms_001.csv') is given; a .csv
+    export without a manifest is hashed itself.
+    """
+    if not file_path.lower().endswith(".json"):
+        stem, ext = os.path.splitext(file_path)
+        candidates = [manifest_path(file_path)]
+        chunk = re.match(r"(.+)_\d{3,}$", stem)
+        if chunk:
+            candidates.append(manifest_path(chunk.group(1) + ext))
+        existing = [path for path in candidates if os.path.exists(path)]
+        if existing or ext.lower() != ".csv":
+            file_path = (existing or candidates)[0]
+    try:
+        if file_path.lower().endswith(".json"):
+            with open(file_path, encoding="utf-8") as f:
+                return dict(json.load(f)["variants"])
+        with open(file_path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return {variant_id: bom_block_hash(block) for variant_id, block in iter_bom_blocks(reader)}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise EngineError(f"Cannot read previous export '{file_path}': {e}")
+
+
+def diff_bom_rows(rows, previous, hashes):
+    """
+    Yields the rows of the BoMs whose content differs from `previous`
+    (variant_id -> hash; None passes everything through) and records the hash
+    of every BoM seen into `hashes`.
+    """
+    for variant_id, block in iter_bom_blocks(rows):
+        block_hash = bom_block_hash(block)
+        hashes[variant_id] = block_hash
+        if previous is None or previous.get(variant_id) != block_hash:
+            yield from block
+
+
+def write_bom_export(file_path, rows, previous=None, chunk_boms=None, workers=None):
+    """
+    Writes a BoM export (CSV or XLSX, from file_path's extension) and its
+    manifest of per-variant hashes.
+
+    With previous hashes (see read_manifest), only the BoMs that are new or
+    changed are written, and the variants whose BoM disappeared are listed in
+    a '<name>_removed.csv' file next to the export.
+
+    With chunk_boms, the export is split into numbered files of that many
+    BoMs each, written in parallel (see write_bom_chunks); the manifest and
+    removed list still cover the whole export.
+
+    Returns (bom_count, removed_variant_ids, paths of the written BoM files).
+    """
+    hashes = {}
+    rows = diff_bom_rows(rows, previous, hashes)
+    if chunk_boms:
+        bom_count, paths = write_bom_chunks(file_path, rows, chunk_boms, workers)
+    else:
+        bom_count = write_bom_file(file_path, rows)
+        paths = [file_path]
+
+    removed = []
+    if previous is not None:
+        removed = [variant_id for variant_id in previous if variant_id not in hashes]
+
+        def write_removed(f):
+            writer = csv.writer(f)
+            writer.writerow(["product_id/id"])
+            writer.writerows([variant_id] for variant_id in removed)
+        _write_atomic(removed_list_path(file_path), write_removed)
+
+    _write_atomic(manifest_path(file_path), lambda f: json.dump({"variants": hashes}, f))
+    return bom_count, removed, paths
+
+
+def describe_paths(paths):
+    """'boms.csv', or 'boms_001.csv ... boms_008.csv (8 files)' for a chunked export."""
+    if len(paths) == 1:
+        return paths[0]
+    return f"{paths[0]} ... {paths[-1]} ({len(paths)} files)"
+
+
+def output_file_name(tmpl_id, file_format="csv"):
+    """Turns an external id such as '__export__.product_template_12' into a safe file name."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(tmpl_id)) + "." + file_format
+
+
+# ------------------ BATCH RUN ------------------
+
+# Per-process state for the pool workers, set once by _init_worker
+_worker_state = {}
+
+
+def _init_worker(templates, product_qty, bom_type, output_dir, since_dir, file_format="csv", chunk_boms=None,
+                 chunk_workers=1):
+    _worker_state.update(
+        templates=templates,
+        product_qty=product_qty,
+        bom_type=bom_type,
+        output_dir=output_dir,
+        since_dir=since_dir,
+        file_format=file_format,
+        chunk_boms=chunk_boms,
+        chunk_workers=chunk_workers,
+    )
+
+
+def _generate_template(tmpl_id, variants, rules=None):
+    state = _worker_state
+    rows = iter_bom_rows(
+        variants, state['templates'].get(tmpl_id, {}), state['product_qty'], state['bom_type'], rules
+    )
+    file_path = os.path.join(state['output_dir'], output_file_name(tmpl_id, state['file_format']))
+
+    previous = None
+    if state['since_dir']:
+        previous_manifest = manifest_path(os.path.join(state['since_dir'], output_file_name(tmpl_id)))
+        if os.path.exists(previous_manifest):
+            previous = read_manifest(previous_manifest)
+
+    bom_count, removed, paths = write_bom_export(
+        file_path, rows, previous, state['chunk_boms'], state['chunk_workers']
+    )
+    return tmpl_id, paths, bom_count, removed
+
+
+def run_batch(variant_index, mapping, output_dir, templates=None,
+              product_qty=1.0, bom_type=DEFAULT_BOM_TYPE, workers=None, since_dir=None,
+              file_format="csv", chunk_boms=None, multi_level=False):
+    """
+    Generates one BoM file per template into output_dir from a resolved BomMapping.
+
+    templates limits the run to the given template ids; by default every
+    template that has an entry in the mapping is generated. Templates are
+    spread over a process pool of `workers` processes (default: CPU count);
+    workers=1 runs everything in the current process.
+
+    file_format is 'csv' or 'xlsx'. With chunk_boms, each template's export
+    is split into numbered files of that many BoMs (see write_bom_chunks).
+
+    With multi_level, the templates of the sub-assemblies used are generated
+    too, before the templates using them (see BomExpander).
+
+    Each file gets a manifest of per-variant hashes. With since_dir (the
+    output directory of a previous run), templates that have a manifest there
+    only get their new or changed BoMs, plus a list of removed ones.
+
+    Returns a list of (template_id, paths of the written BoM files, bom_count, removed_variant_ids).
+    """
+    if templates is None:
+        templates = list(mapping.templates.keys())
+    missing = [t for t in templates if t not in mapping.templates]
+    if missing:
+        raise EngineError(f"No mapping for template(s): {', '.join(missing)}")
+    if multi_level:
+        expander = BomExpander(variant_index, mapping, product_qty)
+        templates = [t for t in expander.template_order(templates) if t in mapping.templates]
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Variants are already parsed and rules matched; workers only receive their template's share
+    jobs = [
+        (t, list(variant_index.iter_variants(t)), TemplateRules(variant_index, t, mapping.template_rules.get(t)))
+        for t in templates
+    ]
+
+    init_args = (mapping.templates, product_qty, bom_type, output_dir, since_dir, file_format, chunk_boms)
+    if workers == 1 or len(jobs) <= 1:
+        # Templates run one after the other here, so chunks can use the workers instead
+        _init_worker(*init_args, chunk_workers=workers)
+        return [_generate_template(*job) for job in jobs]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+        futures = [pool.submit(_generate_template, *job) for job in jobs]
+        for future in as_completed(futures):
+            results.append(future.result())
+    order = {t: i for i, t in enumerate(templates)}
+    results.sort(key=lambda r: order[r[0]])
+    return results
+
+
+# ------------------ COMMAND LINE ------------------
+
+def import_to_odoo(args, variant_index, mapping):
+    """Creates the BoMs of the selected templates directly in Odoo and prints a summary."""
+    import getpass
+    import odoo_rpc
+
+    templates = args.templates or list(mapping.templates.keys())
+    missing = [t for t in templates if t not in mapping.templates]
+    if missing:
+        raise EngineError(f"No mapping for template(s): {', '.join(missing)}")
+
+    password = os.environ.get("ODOO_PASSWORD") or getpass.getpass("Odoo password / API key: ")
+    try:
+        pool = odoo_rpc.ConnectionPool(args.odoo_url, args.odoo_db, args.odoo_user, password, size=args.connections)
+        if args.multi_level:
+            expander = BomExpander(variant_index, mapping, args.qty)
+            rows = expander.iter_bom_rows(
+                [row for tmpl_id in templates for row in variant_index.template_rows.get(tmpl_id, ())], args.bom_type
+            )
+        else:
+            rows = (
+                row
+                for tmpl_id in templates
+                for row in iter_bom_rows(variant_index.iter_variants(tmpl_id), mapping.templates[tmpl_id],
+                                         args.qty, args.bom_type,
+                                         TemplateRules(variant_index, tmpl_id, mapping.template_rules.get(tmpl_id)))
+            )
+        result = odoo_rpc.import_boms(pool, rows, batch_size=args.batch_size)
+    except odoo_rpc.OdooError as e:
+        raise EngineError(str(e))
+
+    for variant_id, message in result["errors"]:
+        print(f"{variant_id or '-'}: {message}")
+    print(f"{len(templates)} templates, {result['created']} BoMs created in Odoo, {len(result['errors'])} errors")
+    return 1 if result["errors"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate Odoo BoM import files for many product templates in one run."
+    )
+    parser.add_argument("variant_file", help="Product variant export (.xlsx or .csv)")
+    parser.add_argument("components_file", help="Components export (.xlsx or .csv)")
+    parser.add_argument("mapping_file", help="Saved mapping file (.json)")
+    parser.add_argument("-o", "--output-dir", default="boms", help="Directory for the generated CSV files")
+    parser.add_argument("-t", "--template", action="append", dest="templates",
+                        help="Template external id to generate (repeatable, default: all mapped templates)")
+    parser.add_argument("--qty", type=float, default=1.0, help="Qty to be produced (default: 1.0)")
+    parser.add_argument("--type", dest="bom_type", choices=BOM_TYPES, default=DEFAULT_BOM_TYPE, help="BoM type")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--since", dest="since_dir", default=None,
+                        help="Output directory of a previous run: only write BoMs that changed since then")
+    parser.add_argument("--format", dest="file_format", choices=["csv", "xlsx"], default="csv",
+                        help="Output file format (default: csv)")
+    parser.add_argument("--chunk-size", type=int, default=None, metavar="BOMS",
+                        help="Split each template's export into files of this many BoMs")
+    parser.add_argument("--multi-level", action="store_true",
+                        help="Also generate the BoMs of the sub-assemblies used, before the BoMs using them")
+    parser.add_argument("--flatten", action="store_true",
+                        help="Also write each template's raw-material requirements through its sub-assemblies "
+                             "(<template>_raw_materials.csv)")
+    parser.add_argument("--strict", action="store_true",
+                        help="Stop when the mapping has unknown or ambiguous components, or components "
+                             "without product id or UoM")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the parsed-file cache")
+    odoo = parser.add_argument_group("direct import", "Create the BoMs in Odoo over XML-RPC instead of writing CSVs")
+    odoo.add_argument("--odoo-url", help="Odoo server URL, e.g. https://erp.example.com")
+    odoo.add_argument("--odoo-db", help="Odoo database name")
+    odoo.add_argument("--odoo-user", help="Odoo login (password/API key from ODOO_PASSWORD or prompted)")
+    odoo.add_argument("--batch-size", type=int, default=200, help="BoMs per create call (default: 200)")
+    odoo.add_argument("--connections", type=int, default=4, help="Parallel connections to Odoo (default: 4)")
+    args = parser.parse_args(argv)
+    if args.odoo_url and not (args.odoo_db and args.odoo_user):
+        parser.error("--odoo-url needs --odoo-db and --odoo-user")
+    if args.chunk_size is not None and args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    import cache
+    import loaders
+
+    def load_variants():
+        variant_data = loaders.read_export(args.variant_file, loaders.VARIANT_COLUMNS)
+        check_variant_columns(variant_data)
+        return VariantIndex(variant_data)
+
+    def load_components():
+        return build_product_info_map(loaders.read_export(args.components_file, loaders.PRODUCT_COLUMNS))
+
+    try:
+        if args.no_cache:
+            variant_index = load_variants()
+            product_info_map = load_components()
+        else:
+            parsed_cache = cache.ParsedCache()
+            variant_index = parsed_cache.load("variants", args.variant_file, load_variants)
+            # Cached apart from the GUI's "components" entries, which also hold the search index
+            product_info_map = parsed_cache.load("catalog", args.components_file, load_components)
+        mapping = load_mapping(args.mapping_file, product_info_map)
+        # The whole mapping is checked once, before anything is written or sent
+        issues = MappingValidator(variant_index).validate(mapping, product_info_map, args.templates)
+        if issues.count():
+            print(f"warning: {issues.summary()}\n{issues.details()}", file=sys.stderr)
+            if args.strict and issues.has_errors():
+                raise EngineError("the mapping has problems (--strict)")
+        if args.odoo_url:
+            return import_to_odoo(args, variant_index, mapping)
+        results = run_batch(
+            variant_index, mapping, args.output_dir,
+            templates=args.templates, product_qty=args.qty,
+            bom_type=args.bom_type, workers=args.workers, since_dir=args.since_dir,
+            file_format=args.file_format, chunk_boms=args.chunk_size, multi_level=args.multi_level
+        )
+        if args.flatten:
+            expander = BomExpander(variant_index, mapping, args.qty)
+            for tmpl_id in args.templates or list(mapping.templates.keys()):
+                file_path = requirements_path(os.path.join(args.output_dir, output_file_name(tmpl_id)))
+                count = write_requirements_csv(
+                    file_path, expander.requirements(variant_index.template_rows.get(tmpl_id, ()))
+                )
+                print(f"{tmpl_id}: raw materials of {count} variants -> {file_path}")
+    except (EngineError, OSError) as e:
+        parser.exit(1, f"error: {e}\n")
+
+    total = 0
+    for tmpl_id, paths, bom_count, removed in results:
+        removed_note = f", {len(removed)} removed" if removed else ""
+        print(f"{tmpl_id}: {bom_count} BoMs{removed_note} -> {describe_paths(paths)}")
+        total += bom_count
+    print(f"{len(results)} templates, {total} BoMs")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
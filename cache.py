@@ -0,0 +1,177 @@
+"""
+On-disk cache of parsed exports for D.U.M.B.
+
+Parsed variant and component tables (and the lookups built from them) are
+stored as pickled pandas/numpy objects, keyed by the source file's content
+hash, size and mtime and by the pandas/numpy versions. Reopening an
+unchanged export skips both the workbook parse and the index build. The
+cache has a size cap and evicts the least recently used entries first.
+"""
+import os
+import json
+import time
+import pickle
+import hashlib
+import threading
+
+# Bump when the layout of cached objects changes, to ignore old entries
+CACHE_VERSION = 5
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir():
+    """Per-user cache directory (override with DUMB_CACHE_DIR)."""
+    if os.environ.get("DUMB_CACHE_DIR"):
+        return os.environ["DUMB_CACHE_DIR"]
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "DUMB", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "dumb")
+
+
+def file_fingerprint(file_path):
+    """Returns a key built from the file's content hash, size and mtime."""
+    stat = os.stat(file_path)
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return f"{digest.hexdigest()}-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def library_versions():
+    """'pandas-2.2.3-numpy-2.2.3': pickles of one version may not load in another."""
+    import numpy
+    import pandas
+    return f"pandas-{pandas.__version__}-numpy-{numpy.__version__}"
+
+
+class ParsedCache:
+    """
+    LRU cache of parsed exports on disk.
+
+    Entries are stored one pickle per file next to an index.json that records
+    their size and last use.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    # ------------------ INDEX ------------------
+
+    def _index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _read_index(self):
+        try:
+            with open(self._index_path(), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path())
+
+    def _entry_key(self, kind, fingerprint):
+        return f"v{CACHE_VERSION}-{library_versions()}-{kind}-{fingerprint}"
+
+    # ------------------ ENTRIES ------------------
+
+    def load(self, kind, file_path, build):
+        """
+        Returns the cached result for (kind, file_path), or calls build(),
+        stores its result and returns it. Cache failures never stop a load.
+        """
+        try:
+            key = self._entry_key(kind, file_fingerprint(file_path))
+        except OSError:
+            return build()
+
+        result = self.get(key)
+        if result is not None:
+            return result
+        result = build()
+        try:
+            self.put(key, result)
+        except Exception:
+            pass
+        return result
+
+    def get(self, key):
+        """Returns the cached result for key, or None. Any failure to read it counts as a miss."""
+        with self.lock:
+            try:
+                index = self._read_index()
+                entry = index.get(key)
+                if entry is None:
+                    return None
+                try:
+                    with open(os.path.join(self.directory, entry["file"]), "rb") as f:
+                        result = pickle.load(f)
+                except Exception:
+                    # Unreadable entry (truncated, or written by other library versions): drop it and rebuild
+                    index.pop(key, None)
+                    result = None
+                else:
+                    entry["last_used"] = time.time()
+                try:
+                    self._write_index(index)
+                except OSError:
+                    pass
+                return result
+            except Exception:
+                return None
+
+    def put(self, key, result):
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            file_name = hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + ".pkl"
+            tmp_path = os.path.join(self.directory, file_name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, os.path.join(self.directory, file_name))
+
+            index = self._read_index()
+            index[key] = {
+                "file": file_name,
+                "size": os.path.getsize(os.path.join(self.directory, file_name)),
+                "last_used": time.time(),
+            }
+            self._evict(index)
+            self._write_index(index)
+
+    def _evict(self, index):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        total = sum(entry["size"] for entry in index.values())
+        for key, entry in sorted(index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, entry["file"]))
+            except OSError:
+                pass
+            total -= entry["size"]
+            del index[key]
+
+    def size(self):
+        """Total size of the cached entries in bytes."""
+        with self.lock:
+            return sum(entry["size"] for entry in self._read_index().values())
+
+    def clear(self):
+        """Deletes every cached entry."""
+        with self.lock:
+            for entry in self._read_index().values():
+                try:
+                    os.remove(os.path.join(self.directory, entry["file"]))
+                except OSError:
+                    pass
+            self._write_index({})
@@ -0,0 +1,119 @@
+"""
+Reading Odoo exports for D.U.M.B.
+
+Only the columns the tool uses are kept, and repetitive text columns are
+stored as categoricals. Excel workbooks are streamed row by row with
+openpyxl's read-only reader, CSV exports are read in chunks, and both
+report progress and can be cancelled between rows/chunks.
+"""
+import os
+
+import bom_engine
+
+# Columns kept from each export
+VARIANT_COLUMNS = [
+    bom_engine.VARIANT_ID_COLUMN,
+    bom_engine.PRODUCT_GROUP_COLUMN,
+    bom_engine.PRODUCT_GROUP_NAME_COLUMN,
+    bom_engine.VARIANT_COLUMN,
+]
+PRODUCT_COLUMNS = [
+    bom_engine.PRODUCT_ID_COLUMN,
+    bom_engine.PRODUCT_COLUMN,
+    bom_engine.UOM_COLUMN,
+]
+
+FILE_FILTER = "Odoo Exports (*.xlsx *.xls *.csv);;Excel Files (*.xlsx *.xls);;CSV Files (*.csv)"
+
+# Rows between progress reports / cancel checks when streaming a workbook
+PROGRESS_EVERY = 2000
+CSV_CHUNK_ROWS = 50000
+
+
+class LoadCancelled(bom_engine.Cancelled):
+    """Raised when a load is cancelled through is_cancelled()."""
+
+
+def read_export(file_path, columns, progress=None, is_cancelled=None):
+    """
+    Reads the given columns of an Odoo export (.xlsx, .xls or .csv) into a DataFrame.
+
+    progress(done, total) is called from time to time (total is 0 when unknown);
+    is_cancelled() is polled between rows/chunks and aborts the load with
+    LoadCancelled when it returns True. Columns missing from the file are
+    simply absent from the result.
+    """
+    import pandas as pd
+    progress = progress or (lambda done, total: None)
+    is_cancelled = is_cancelled or (lambda: False)
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".csv":
+        return compact(_read_csv(file_path, columns, progress, is_cancelled))
+    if ext == ".xls":
+        # Legacy format: no streaming reader, let pandas handle it
+        data = pd.read_excel(file_path, usecols=lambda c: c in columns)
+        progress(1, 1)
+        return compact(data)
+    return compact(_read_xlsx(file_path, columns, progress, is_cancelled))
+
+
+def compact(data):
+    """
+    Converts text columns whose values mostly repeat (template ids and names,
+    UoMs, ...) to categoricals, so each distinct string is held once.
+    """
+    for column in data.columns:
+        values = data[column]
+        if values.dtype == object and len(values) and values.nunique() <= len(values) // 2:
+            data[column] = values.astype("category")
+    return data
+
+
+def _read_xlsx(file_path, columns, progress, is_cancelled):
+    import numpy as np
+    import pandas as pd
+    from openpyxl import load_workbook
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        total = max((ws.max_row or 1) - 1, 0)
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, ())
+        wanted = [(i, name) for i, name in enumerate(header) if name in columns]
+        values = {name: [] for _, name in wanted}
+
+        done = 0
+        for row in rows:
+            if not any(cell is not None for cell in row):
+                continue
+            for i, name in wanted:
+                cell = row[i] if i < len(row) else None
+                # Empty cells read as NaN, as with pd.read_excel
+                values[name].append(np.nan if cell is None else cell)
+            done += 1
+            if done % PROGRESS_EVERY == 0:
+                if is_cancelled():
+                    raise LoadCancelled()
+                progress(done, max(total, done))
+    finally:
+        wb.close()
+
+    progress(done, done)
+    return pd.DataFrame(values)
+
+
+def _read_csv(file_path, columns, progress, is_cancelled):
+    import pandas as pd
+    total = os.path.getsize(file_path)
+    chunks = []
+    with open(file_path, "rb") as f:
+        reader = pd.read_csv(f, usecols=lambda c: c in columns, encoding="utf-8-sig", chunksize=CSV_CHUNK_ROWS)
+        for chunk in reader:
+            if is_cancelled():
+                raise LoadCancelled()
+            chunks.append(chunk)
+            progress(f.tell(), total)
+    progress(total, total)
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
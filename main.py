@@ -1,14 +1,34 @@
+import time
+# Start-up time is measured from here (see --startup-check)
+STARTED = time.perf_counter()
+
 import os
 import sys
-import csv
-import pandas as pd
+import json
+import argparse
+import threading
+import multiprocessing
+import bom_engine
+import loaders
+import cache
+import mapping_view
+import profiling
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QLabel, QHBoxLayout,
-    QComboBox, QDoubleSpinBox, QMessageBox, QCompleter, QScrollArea, QDialog,
-    QDialogButtonBox, QSizePolicy
+    QComboBox, QDoubleSpinBox, QMessageBox, QDialog, QDialogButtonBox, QSizePolicy,
+    QProgressDialog, QTreeView, QAbstractItemView, QHeaderView, QCheckBox, QLineEdit, QFormLayout, QSpinBox
 )
 from PyQt6.QtGui import QIcon, QPixmap
-from PyQt6.QtCore import QSize, Qt
+from PyQt6.QtCore import Qt, QStringListModel, QObject, QThread, QTimer, QFileSystemWatcher, pyqtSignal
+
+# BoMs per file when splitting an export
+DEFAULT_CHUNK_BOMS = 1000
+
+# Quiet time after an edit before the mapping is checked again
+VALIDATION_DELAY_MS = 300
+
+# Imported on first use only; --startup-check reports any of them loaded at start-up
+HEAVY_MODULES = ("numpy", "pandas", "openpyxl")
 
 def resource_path(relative_path):
     """Get absolute path to resource, works for development and for PyInstaller bundle."""
@@ -19,6 +39,145 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+# ------------------ BACKGROUND TASKS ------------------
+
+class BackgroundTask(QObject):
+    """
+    Runs fn(progress, is_cancelled) on a worker thread.
+
+    fn reports progress by calling progress(done, total) and should stop with
+    bom_engine.Cancelled when is_cancelled() returns True.
+    """
+    progress = pyqtSignal(int, int)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+    def __init__(self, fn):
+        super().__init__()
+        self.fn = fn
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        try:
+            with profiling.profiler.profile_thread():
+                result = self.fn(self.progress.emit, self.cancel_event.is_set)
+        except bom_engine.Cancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(result)
+        finally:
+            self.finished.emit()
+
+class EventLoopMonitor(QObject):
+    """
+    Detects GUI event-loop stalls: a timer that should fire every INTERVAL_MS
+    and reports to the profiler whenever it fires more than STALL_MS late.
+    """
+    INTERVAL_MS = 50
+    STALL_MS = 100
+
+    def __init__(self, profiler, parent=None):
+        super().__init__(parent)
+        self.profiler = profiler
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.INTERVAL_MS)
+        self.timer.timeout.connect(self.tick)
+        self.last = None
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.timer.start()
+
+    def tick(self):
+        now = time.perf_counter()
+        late = now - self.last - self.INTERVAL_MS / 1000
+        if late * 1000 > self.STALL_MS:
+            self.profiler.record_stall(self.last + self.INTERVAL_MS / 1000, late)
+        self.last = now
+
+# ------------------ FILE WATCHING ------------------
+
+class ExportWatcher(QObject):
+    """
+    Watches the loaded export files and emits changed(path) once a changed
+    file has been quiet for DEBOUNCE_MS, so a burst of writes (Excel saves
+    in several steps, often by replacing the file) triggers a single reload.
+    """
+    DEBOUNCE_MS = 1500
+    changed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.schedule)
+        # A file replaced by a rename drops out of the file watch; its directory still sees it
+        self.watcher.directoryChanged.connect(self.directory_changed)
+        # path -> (size, mtime) last reported, and path -> debounce timer
+        self.stamps = {}
+        self.timers = {}
+
+    def _stamp(self, file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def watch(self, file_path):
+        self.stamps[file_path] = self._stamp(file_path)
+        if file_path not in self.watcher.files():
+            self.watcher.addPath(file_path)
+        directory = os.path.dirname(file_path)
+        if directory not in self.watcher.directories():
+            self.watcher.addPath(directory)
+
+    def unwatch(self, file_path):
+        self.stamps.pop(file_path, None)
+        timer = self.timers.pop(file_path, None)
+        if timer is not None:
+            timer.stop()
+        if file_path in self.watcher.files():
+            self.watcher.removePath(file_path)
+        directory = os.path.dirname(file_path)
+        if directory in self.watcher.directories() and not any(os.path.dirname(p) == directory for p in self.stamps):
+            self.watcher.removePath(directory)
+
+    def clear(self):
+        for file_path in list(self.stamps):
+            self.unwatch(file_path)
+
+    def directory_changed(self, directory):
+        for file_path in list(self.stamps):
+            if os.path.dirname(file_path) == directory:
+                self.schedule(file_path)
+
+    def schedule(self, file_path):
+        """(Re)starts the quiet period of a file."""
+        if file_path not in self.stamps:
+            return
+        timer = self.timers.get(file_path)
+        if timer is None:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(self.DEBOUNCE_MS)
+            timer.timeout.connect(lambda: self.settled(file_path))
+            self.timers[file_path] = timer
+        timer.start()
+
+    def settled(self, file_path):
+        stamp = self._stamp(file_path)
+        # Still being replaced, or touched without a change (e.g. a sibling file changed)
+        if stamp is None or stamp == self.stamps.get(file_path):
+            return
+        self.stamps[file_path] = stamp
+        if file_path not in self.watcher.files():
+            self.watcher.addPath(file_path)
+        self.changed.emit(file_path)
+
 class AttributeMapper(QWidget):
     def __init__(self):
         super().__init__()
@@ -36,7 +195,26 @@ class AttributeMapper(QWidget):
         header_spacer = QWidget()
         header_spacer.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
         header_layout.addWidget(header_spacer)
+
+        self.memory_label = QLabel("")
+        self.memory_label.setToolTip("Approximate memory used by the loaded exports")
+        header_layout.addWidget(self.memory_label)
+
+        self.changes_label = QLabel("")
+        header_layout.addWidget(self.changes_label)
+
+        self.watch_checkbox = QCheckBox("Watch files")
+        self.watch_checkbox.setToolTip(
+            "Reload the export files when they change on disk, applying only the added, removed or changed rows"
+        )
+        self.watch_checkbox.toggled.connect(self.set_watching)
+        header_layout.addWidget(self.watch_checkbox)
         
+        self.clear_cache_button = QPushButton("Clear Cache")
+        self.clear_cache_button.setToolTip("Delete the cached copies of previously loaded export files")
+        self.clear_cache_button.clicked.connect(self.clear_cache)
+        header_layout.addWidget(self.clear_cache_button)
+
         self.info_button = QPushButton("i")
         self.info_button.setFixedSize(30, 30)
         self.info_button.setStyleSheet("border-radius: 15px; background-color: #0078d7; color: white; font-weight: bold;")
@@ -86,15 +264,69 @@ class AttributeMapper(QWidget):
         # ------------------ STEP 4: ASSIGN COMPONENTS TO YOUR RECIPE ------------------
         self.add_segment_header(
             "Step 4: Assign Components to Your Recipe", 
-            "For each attribute value, assign one or more components for the BoM.",
+            "For each attribute value, assign one or more components for the BoM.\nSelect a value and click 'Add Component', then double-click a line to change its product or quantity.",
             "assets/help_assign.png"
         )
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_content = QWidget()
-        self.scroll_layout = QVBoxLayout(self.scroll_content)
-        self.scroll_area.setWidget(self.scroll_content)
-        self.layout.addWidget(self.scroll_area)
+        # Sorted product names, shared by every component picker and its completer
+        self.product_model = QStringListModel(self)
+
+        self.assignment_model = mapping_view.AssignmentModel(self)
+        self.assignment_view = QTreeView()
+        self.assignment_view.setModel(self.assignment_model)
+        self.assignment_view.setUniformRowHeights(True)
+        self.assignment_view.setAlternatingRowColors(True)
+        self.assignment_view.setEditTriggers(
+            QAbstractItemView.EditTrigger.DoubleClicked
+            | QAbstractItemView.EditTrigger.SelectedClicked
+            | QAbstractItemView.EditTrigger.EditKeyPressed
+            | QAbstractItemView.EditTrigger.AnyKeyPressed
+        )
+        self.assignment_view.setItemDelegateForColumn(
+            mapping_view.PRODUCT_COL,
+            mapping_view.ProductDelegate(self.product_model, self.search_products, self.assignment_view)
+        )
+        self.assignment_view.setItemDelegateForColumn(
+            mapping_view.QTY_COL, mapping_view.QtyDelegate(self.assignment_view)
+        )
+        self.assignment_view.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.layout.addWidget(self.assignment_view)
+
+        assignment_buttons = QHBoxLayout()
+        self.add_component_btn = QPushButton("Add Component")
+        self.add_component_btn.setToolTip("Add a component line to the selected attribute value")
+        self.add_component_btn.clicked.connect(self.add_component_line)
+        assignment_buttons.addWidget(self.add_component_btn)
+        self.remove_component_btn = QPushButton("Remove Component")
+        self.remove_component_btn.clicked.connect(self.remove_component_line)
+        assignment_buttons.addWidget(self.remove_component_btn)
+        self.rules_btn = QPushButton("Combination Rules...")
+        self.rules_btn.setToolTip("Components that depend on several attribute values at once")
+        self.rules_btn.clicked.connect(self.edit_rules)
+        assignment_buttons.addWidget(self.rules_btn)
+        assignment_buttons.addStretch()
+        self.save_mapping_btn = QPushButton("Save Mapping...")
+        self.save_mapping_btn.setToolTip("Save the component assignments of all templates to a file")
+        self.save_mapping_btn.clicked.connect(self.save_mapping)
+        assignment_buttons.addWidget(self.save_mapping_btn)
+        self.load_mapping_btn = QPushButton("Load Mapping...")
+        self.load_mapping_btn.clicked.connect(self.load_mapping)
+        assignment_buttons.addWidget(self.load_mapping_btn)
+        self.layout.addLayout(assignment_buttons)
+
+        # Live check of the whole mapping against the exports, re-run shortly after each edit
+        self.validation_label = QLabel("")
+        self.validation_label.setWordWrap(True)
+        self.layout.addWidget(self.validation_label)
+        self.validation_timer = QTimer(self)
+        self.validation_timer.setSingleShot(True)
+        self.validation_timer.setInterval(VALIDATION_DELAY_MS)
+        self.validation_timer.timeout.connect(self.run_validation)
+        for signal in (
+            self.assignment_model.dataChanged, self.assignment_model.rowsInserted,
+            self.assignment_model.rowsRemoved, self.assignment_model.modelReset,
+            self.assignment_model.layoutChanged,
+        ):
+            signal.connect(lambda *args: self.validation_timer.start())
         
         # ------------------ STEP 5: GENERATE CSV FILE ------------------
         self.add_segment_header(
@@ -107,29 +339,44 @@ class AttributeMapper(QWidget):
         self.layout.addWidget(self.generate_btn)
         
         # ------------------ DATA & MAPPING STRUCTURES ------------------
-        self.variant_data = None
-        self.product_data = None
+        # The exports themselves are not kept: only the compact structures built from them
+
+        # Parsed variant values with template / (attribute, value) lookups
+        self.variant_index = None
+
+        # Paths of the loaded exports, reloaded by refresh_files and the watcher
+        self.variant_path = None
+        self.product_path = None
+        self.export_watcher = ExportWatcher(self)
+        self.export_watcher.changed.connect(self.export_file_changed)
+        # path -> (summary, details) of the last reload of each export
+        self.change_reports = {}
+
+        # Checks the mapping against the loaded variants (a bom_engine.MappingValidator per variant export)
+        self.validator = None
+
+        # (QThread, BackgroundTask) pairs still running
+        self.background_tasks = []
+
+        # Parsed exports cached on disk, keyed by source file fingerprint
+        self.parsed_cache = cache.ParsedCache()
+
+        # Odoo URL / database / user last used for a direct import
+        self.odoo_settings = {}
         
-        # For quick product lookups: product_name -> { 'id': ..., 'uom_id': ... }
+        # For quick product lookups: product_name -> (id, uom_id), a bom_engine.ProductCatalog
+        # once a components file is loaded (an empty dict keeps pandas out of start-up)
         self.product_info_map = {}
-        
-        # Expected columns in the Excel files
-        self.variant_column = "product_template_variant_value_ids"
-        self.product_group_column = "product_tmpl_id/id"
-        self.product_group_name_column = "product_tmpl_id/name"
-        self.variant_id_column = "id"  # The variant's product ID in Odoo
-        
-        self.product_column = "name"
-        self.product_id_column = "id"
-        self.uom_column = "uom_id"
+
+        # Ranked lookup over the component names for the product pickers (product_search.ProductSearchIndex)
+        self.product_search = None
         
         # Holds attribute names and their possible values
         self.attributes = {}
         
-        # For storing user-assigned components per (attribute, value)
-        # Key: (attribute, value)
-        # Value: list of dicts { 'combo': QComboBox, 'qty': QDoubleSpinBox, 'uom_label': QLabel, 'widget': QWidget }
-        self.components_map = {}
+        # User-assigned components of every template: template_id -> { (attribute, value): [ComponentLine] }
+        # The assignment tree edits it in place; generation only reads from it.
+        self.mapping = bom_engine.BomMapping()
 
     # ------------------ SEGMENT HEADERS & HELP ------------------
     
@@ -193,176 +440,391 @@ class AttributeMapper(QWidget):
         )
         QMessageBox.information(self, "About", info_text)
 
+    def clear_cache(self):
+        freed = self.parsed_cache.size()
+        self.parsed_cache.clear()
+        QMessageBox.information(self, "Cache", f"Cache cleared ({freed / (1024 * 1024):.1f} MB freed).")
+
     # ------------------ FILE LOADING ------------------
     
+    def run_in_background(self, label, fn, on_success):
+        """
+        Runs fn(progress, is_cancelled) on a worker thread behind a progress dialog
+        with a Cancel button, then calls on_success(result) on the GUI thread.
+        """
+        dialog = QProgressDialog(label, "Cancel", 0, 0, self)
+        dialog.setWindowTitle("Please wait")
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(300)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+
+        thread = QThread(self)
+        task = BackgroundTask(fn)
+        task.moveToThread(thread)
+
+        def on_progress(done, total):
+            if total > 0:
+                dialog.setRange(0, 1000)
+                dialog.setValue(min(int(done * 1000 / total), 1000))
+
+        def on_finished():
+            thread.quit()
+            dialog.close()
+            self.background_tasks.remove((thread, task))
+
+        # Set the flag directly from the GUI thread: the task's own thread is busy running fn
+        dialog.canceled.connect(task.cancel_event.set)
+        task.progress.connect(on_progress)
+        task.succeeded.connect(on_success)
+        task.failed.connect(self.show_error)
+        task.finished.connect(on_finished)
+        thread.started.connect(task.run)
+        thread.finished.connect(thread.deleteLater)
+
+        # Keep references until the task is done
+        self.background_tasks.append((thread, task))
+        thread.start()
+        dialog.show()
+
     def load_variant_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select Product Variant File", "", "Excel Files (*.xlsx *.xls)")
-        if file_path:
-            self.variant_data = pd.read_excel(file_path)
-            self.variant_file_label.setText(file_path.split("/")[-1])
-            # Validate columns
-            if self.variant_column not in self.variant_data.columns:
-                self.show_error(f"Column '{self.variant_column}' not found in the variant file")
-                self.variant_data = None
-                return
-            if self.variant_id_column not in self.variant_data.columns:
-                self.show_error(f"Column '{self.variant_id_column}' (Variant ID) not found in the variant file")
-                self.variant_data = None
-                return
-            self.populate_group_dropdown()
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Product Variant File", "", loaders.FILE_FILTER)
+        if not file_path:
+            return
+        self.open_variant_file(file_path)
+
+    def open_variant_file(self, file_path):
+        """
+        Loads a variant export. When variants are already loaded, the new ones
+        are diffed against them and only the differences reach the template
+        dropdown and the assignment tree.
+        """
+        previous = self.variant_index
+
+        def load(progress, is_cancelled):
+            def build():
+                with profiling.stage("file_load") as record:
+                    variant_data = loaders.read_export(file_path, loaders.VARIANT_COLUMNS, progress, is_cancelled)
+                    record["rows"] = len(variant_data)
+                bom_engine.check_variant_columns(variant_data)
+                # Parse all variant values once; template switches and generation are lookups from here on
+                with profiling.stage("variant_parse", len(variant_data)):
+                    return bom_engine.VariantIndex(variant_data)
+            with profiling.stage("variant_file") as record:
+                variant_index = self.parsed_cache.load("variants", file_path, build)
+                record["rows"] = len(variant_index.variant_ids)
+            # Measured here, off the GUI thread
+            variant_index.memory_bytes()
+            changes = bom_engine.diff_variants(previous, variant_index) if previous is not None else None
+            return variant_index, changes
+
+        def loaded(result):
+            self.variant_index, changes = result
+            self.variant_file_label.setText(os.path.basename(file_path))
+            self.set_export_path("variant_path", file_path)
+            if changes is None:
+                self.populate_group_dropdown()
+            else:
+                self.update_group_dropdown(changes)
+                self.report_changes(file_path, bom_engine.describe_changes(changes, "variants"), changes)
+            self.update_memory_label()
+
+        self.run_in_background(f"Loading {os.path.basename(file_path)}...", load, loaded)
     
     def load_product_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select Components File", "", "Excel Files (*.xlsx *.xls)")
-        if file_path:
-            self.product_data = pd.read_excel(file_path)
-            self.product_file_label.setText(file_path.split("/")[-1])
-            # Build product info map
-            self.product_info_map.clear()
-            for idx, row in self.product_data.iterrows():
-                product_name = str(row.get(self.product_column, ""))
-                product_id = str(row.get(self.product_id_column, ""))
-                uom = str(row.get(self.uom_column, ""))
-                self.product_info_map[product_name] = {'id': product_id, 'uom_id': uom}
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Components File", "", loaders.FILE_FILTER)
+        if not file_path:
+            return
+        self.open_product_file(file_path)
+
+    def open_product_file(self, file_path):
+        """
+        Loads a components export. When components are already loaded, the new
+        ones are diffed against them; assignments are kept and re-resolved.
+        """
+        previous = self.product_info_map if self.product_search is not None else None
+
+        def load(progress, is_cancelled):
+            def build():
+                # Needs numpy; imported with the first components file, not at start-up
+                import product_search
+                with profiling.stage("file_load") as record:
+                    product_data = loaders.read_export(file_path, loaders.PRODUCT_COLUMNS, progress, is_cancelled)
+                    record["rows"] = len(product_data)
+                with profiling.stage("product_index", len(product_data)):
+                    product_info_map = bom_engine.build_product_info_map(product_data)
+                    # Search index for the component pickers, built once per file
+                    search_index = product_search.ProductSearchIndex(
+                        product_data[bom_engine.PRODUCT_COLUMN].dropna().astype(str)
+                    )
+                return product_info_map, search_index
+            with profiling.stage("component_file") as record:
+                result = self.parsed_cache.load("components", file_path, build)
+                record["rows"] = len(result[0])
+            for part in result:
+                part.memory_bytes()
+            changes = bom_engine.diff_catalogs(previous, result[0]) if previous is not None else None
+            return result, changes
+
+        def loaded(result):
+            (self.product_info_map, self.product_search), changes = result
+            self.product_file_label.setText(os.path.basename(file_path))
+            self.set_export_path("product_path", file_path)
+            if changes is None or any(changes.values()):
+                self.refresh_product_model()
+            if changes is not None:
+                summary = bom_engine.describe_changes(changes, "components")
+                # Assigned lines keep their product name; say which ones no longer resolve
+                removed = set(changes["removed"])
+                orphaned = sum(1 for line in self.mapping.iter_lines() if line.product_name in removed)
+                if orphaned:
+                    summary += f" ({orphaned} assigned line(s) use a removed component)"
+                self.report_changes(file_path, summary, changes)
+            self.update_memory_label()
+
+        self.run_in_background(f"Loading {os.path.basename(file_path)}...", load, loaded)
+
+    def refresh_product_model(self):
+        """
+        Refills the shared product model from the components file. Every component
+        picker shows this one model, so they all update together.
+        """
+        self.product_model.setStringList(self.product_search.names)
+        self.mapping.resolve(self.product_info_map)
+        self.assignment_model.set_product_info_map(self.product_info_map)
     
+    def update_memory_label(self):
+        """Shows the approximate memory held by the loaded variants and components."""
+        variants = self.variant_index.memory_bytes() if self.variant_index is not None else 0
+        components = 0
+        if self.product_search is not None:
+            components = self.product_info_map.memory_bytes() + self.product_search.memory_bytes()
+        self.memory_label.setText(
+            f"Loaded data: {(variants + components) / 1e6:.1f} MB "
+            f"(variants {variants / 1e6:.1f} MB, components {components / 1e6:.1f} MB)"
+        )
+
+    def search_products(self, text):
+        """Top matches for text in the loaded components, used by every component picker."""
+        if self.product_search is None:
+            return []
+        return self.product_search.search(text)
+
     def refresh_files(self):
-        self.load_variant_file()
-        self.load_product_file()
+        """Reloads the loaded exports from disk (asking for the files not loaded yet)."""
+        if self.variant_path:
+            self.open_variant_file(self.variant_path)
+        else:
+            self.load_variant_file()
+        if self.product_path:
+            self.open_product_file(self.product_path)
+        else:
+            self.load_product_file()
+
+    # ------------------ WATCHING & CHANGES ------------------
+
+    def set_export_path(self, attribute, file_path):
+        """Remembers the path of a loaded export and moves the watch to it."""
+        old_path = getattr(self, attribute)
+        setattr(self, attribute, file_path)
+        if old_path and old_path != file_path and old_path not in (self.variant_path, self.product_path):
+            self.export_watcher.unwatch(old_path)
+        if self.watch_checkbox.isChecked():
+            self.export_watcher.watch(file_path)
+
+    def set_watching(self, enabled):
+        self.export_watcher.clear()
+        if enabled:
+            for file_path in {self.variant_path, self.product_path} - {None}:
+                self.export_watcher.watch(file_path)
+
+    def export_file_changed(self, file_path):
+        # Wait for a running load / generation to finish before swapping the data under it
+        if self.background_tasks:
+            QTimer.singleShot(ExportWatcher.DEBOUNCE_MS, lambda: self.export_file_changed(file_path))
+            return
+        if file_path == self.variant_path:
+            self.open_variant_file(file_path)
+        if file_path == self.product_path:
+            self.open_product_file(file_path)
+
+    def report_changes(self, file_path, summary, changes, shown=20):
+        """
+        Shows what the last reload of each export changed, with the first ids /
+        names of each kind in the tooltip.
+        """
+        title = f"{os.path.basename(file_path)} {time.strftime('%H:%M')}: {summary}"
+        details = [title]
+        for kind in ("added", "removed", "changed"):
+            items = changes[kind]
+            if items:
+                more = f" (+{len(items) - shown} more)" if len(items) > shown else ""
+                details.append(f"  {kind.capitalize()}: {', '.join(map(str, items[:shown]))}{more}")
+        self.change_reports[file_path] = (title, "\n".join(details))
+        self.changes_label.setText(" | ".join(title for title, _ in self.change_reports.values()))
+        self.changes_label.setToolTip("\n".join(text for _, text in self.change_reports.values()))
     
     # ------------------ GROUP & ATTRIBUTES ------------------
     
     def populate_group_dropdown(self):
-        if self.variant_data is None:
+        if self.variant_index is None:
             return
-        self.product_group_combo.clear()
-        groups = self.variant_data[[self.product_group_column, self.product_group_name_column]].drop_duplicates()
-        for _, row in groups.iterrows():
-            self.product_group_combo.addItem(str(row[self.product_group_name_column]), row[self.product_group_column])
+        with profiling.stage("group_dropdown", len(self.variant_index.template_names)):
+            self.product_group_combo.clear()
+            for tmpl_id, tmpl_name in self.variant_index.template_names.items():
+                self.product_group_combo.addItem(tmpl_name, tmpl_id)
     
+    def update_group_dropdown(self, changes):
+        """
+        Applies template changes to the dropdown in place, keeping the selected
+        template; its assignment tree is only rebuilt when it was affected.
+        """
+        names = self.variant_index.template_names
+        combo = self.product_group_combo
+        selected = combo.currentData()
+        with profiling.stage("group_dropdown", len(changes["templates"])):
+            combo.blockSignals(True)
+            try:
+                for i in reversed(range(combo.count())):
+                    tmpl_id = combo.itemData(i)
+                    if tmpl_id not in names:
+                        combo.removeItem(i)
+                    elif combo.itemText(i) != names[tmpl_id]:
+                        combo.setItemText(i, names[tmpl_id])
+                present = {combo.itemData(i) for i in range(combo.count())}
+                for tmpl_id, tmpl_name in names.items():
+                    if tmpl_id not in present:
+                        combo.addItem(tmpl_name, tmpl_id)
+            finally:
+                combo.blockSignals(False)
+        if combo.currentData() != selected or selected in changes["templates"]:
+            self.populate_attributes()
+
     def populate_attributes(self):
         """
-        Displays attributes in the scroll area. Each (attribute, value) pair can have multiple
-        component lines assigned.
+        Shows the attributes of the selected template in the assignment tree. Each
+        (attribute, value) pair can have multiple component lines assigned.
         """
-        if self.variant_data is None:
+        if self.variant_index is None:
             return
 
-        # Clear existing items
-        while self.scroll_layout.count():
-            item = self.scroll_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
         selected_group = self.product_group_combo.currentData()
         if not selected_group:
+            self.assignment_model.set_attributes({}, {})
             return
 
-        group_variants = self.variant_data[self.variant_data[self.product_group_column] == selected_group]
-        self.attributes.clear()
-        self.components_map.clear()
-
-        for _, row in group_variants.iterrows():
-            raw_variants = str(row[self.variant_column]).split(",")
-            for item in raw_variants:
-                item = item.strip()
-                if not item:
-                    continue
-                if ": " in item:
-                    attribute, value = item.split(": ", 1)
-                else:
-                    attribute, value = "Unknown", item
-                if attribute not in self.attributes:
-                    self.attributes[attribute] = []
-                if value not in self.attributes[attribute]:
-                    self.attributes[attribute].append(value)
-
-        # Build the UI for each attribute/value
-        for attribute in sorted(self.attributes.keys()):
-            attribute_label = QLabel(attribute)
-            attribute_label.setStyleSheet("font-weight: bold; font-size: 14px;")
-            self.scroll_layout.addWidget(attribute_label)
-
-            for value in self.attributes[attribute]:
-                variant_widget = QWidget()
-                variant_layout = QVBoxLayout(variant_widget)
-
-                value_label = QLabel(f"- {value}")
-                variant_layout.addWidget(value_label)
-
-                components_container = QVBoxLayout()
-                variant_layout.addLayout(components_container)
-
-                # Track components for (attribute, value)
-                self.components_map.setdefault((attribute, value), [])
-
-                add_component_btn = QPushButton("Add Component")
-                add_component_btn.clicked.connect(
-                    lambda _, c=components_container, attr=attribute, val=value: self.add_component_line(c, attr, val)
-                )
-                variant_layout.addWidget(add_component_btn)
-
-                self.scroll_layout.addWidget(variant_widget)
+        with profiling.stage("attribute_ui") as record:
+            self.attributes = self.variant_index.template_attributes(selected_group)
+            self.mapping.template_names[selected_group] = self.product_group_combo.currentText()
+            self.assignment_model.set_attributes(
+                self.attributes, self.mapping.assignments(selected_group), self.mapping.subassemblies
+            )
+            self.assignment_view.expandToDepth(0)
+            record["rows"] = len(self.assignment_model.value_keys)
     
-    # ------------------ ADD COMPONENT LINE ------------------
+    # ------------------ COMPONENT LINES ------------------
     
-    def add_component_line(self, container_layout, attribute, value):
+    def add_component_line(self):
+        """
+        Adds a component line under the selected attribute value (or next to the
+        selected component line). The line is edited in place in the tree.
+        """
+        key = self.assignment_model.key_for_index(self.assignment_view.currentIndex())
+        if key is None:
+            self.show_error("Select an attribute value to add a component to.")
+            return
+        with profiling.stage("component_line", 1):
+            # First product of the shared model, read without copying the list
+            first_product = self.product_model.index(0, 0).data() if self.product_model.rowCount() else ""
+            index = self.assignment_model.add_line(key, first_product)
+            self.assignment_view.expand(index.parent())
+            self.assignment_view.setCurrentIndex(index)
+            self.assignment_view.edit(index)
+
+    def remove_component_line(self):
+        index = self.assignment_view.currentIndex()
+        if self.assignment_model.is_line(index):
+            self.assignment_model.remove_line(index)
+
+    def edit_rules(self):
+        selected_group = self.product_group_combo.currentData()
+        if self.variant_index is None or not selected_group:
+            self.show_error("No product group selected.")
+            return
+        dialog = mapping_view.RulesDialog(
+            self.attributes, self.mapping.rules(selected_group), self.product_model, self.search_products,
+            self.product_info_map, self
+        )
+        dialog.exec()
+        self.validation_timer.start()
+
+    # ------------------ VALIDATION ------------------
+
+    def validate_mapping(self, templates=None):
+        """Returns the bom_engine.MappingIssues of the mapping (or of some templates), or None without variants."""
+        if self.variant_index is None:
+            return None
+        if self.validator is None or self.validator.variant_index is not self.variant_index:
+            self.validator = bom_engine.MappingValidator(self.variant_index)
+        with profiling.stage("validation") as record:
+            issues = self.validator.validate(self.mapping, self.product_info_map, templates)
+            record["rows"] = issues.count()
+        return issues
+
+    def run_validation(self):
+        """Shows the problems of the selected template under the assignment tree, details in the tooltip."""
+        selected_group = self.product_group_combo.currentData()
+        issues = self.validate_mapping([selected_group]) if selected_group else None
+        if issues is None:
+            self.validation_label.setText("")
+            self.validation_label.setToolTip("")
+            return
+        if not issues.count():
+            self.validation_label.setStyleSheet("color: green;")
+            self.validation_label.setText("\u2714 No problems found in this template's mapping")
+            self.validation_label.setToolTip("")
+            return
+        self.validation_label.setStyleSheet("color: #c00000;" if issues.has_errors() else "color: #a06000;")
+        self.validation_label.setText(f"\u26a0 {issues.summary()}")
+        self.validation_label.setToolTip(issues.details(20))
+
+    def confirm_export(self, selected_group):
         """
-        Adds a new row with:
-          - Product combo box
-          - Quantity spin box
-          - Read-only UoM label
-          - Remove button
+        Checks the selected template before an export. Problems that make the
+        export wrong or incomplete (unknown / ambiguous components, missing
+        UoMs, skipped variants) are shown, and the user decides whether to go on.
         """
-        component_widget = QWidget()
-        layout = QHBoxLayout(component_widget)
-
-        # Product combo
-        combo = QComboBox()
-        combo.setEditable(True)
-        if self.product_data is not None:
-            products = self.product_data[self.product_column].dropna().astype(str).tolist()
-            combo.addItems(products)
-            completer = QCompleter(products)
-            completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-            combo.setCompleter(completer)
-        layout.addWidget(combo)
-
-        # Quantity
-        qty_input = QDoubleSpinBox()
-        qty_input.setDecimals(2)
-        qty_input.setRange(0.01, 10000)
-        qty_input.setValue(1.00)
-        layout.addWidget(qty_input)
-
-        # UoM label
-        uom_label = QLabel("")
-        uom_label.setStyleSheet("background-color: transparent; padding: 2px;")
-        uom_label.setMinimumWidth(50)
-        layout.addWidget(uom_label)
-
-        # Update UoM whenever the combo changes
-        combo.currentIndexChanged.connect(lambda idx, c=combo, l=uom_label: self.update_uom_label(c, l))
-        if combo.count() > 0:
-            self.update_uom_label(combo, uom_label)
-
-        # Remove button
-        remove_btn = QPushButton("X")
-        remove_btn.setFixedSize(QSize(30, 30))
-        remove_btn.clicked.connect(lambda _, w=component_widget: w.setParent(None))
-        layout.addWidget(remove_btn)
-
-        container_layout.addWidget(component_widget)
-
-        self.components_map[(attribute, value)].append({
-            'combo': combo,
-            'qty': qty_input,
-            'uom_label': uom_label,
-            'widget': component_widget
-        })
-
-    def update_uom_label(self, combo, label):
-        selected_product = combo.currentText()
-        info = self.product_info_map.get(selected_product, {})
-        label.setText(info.get('uom_id', ""))
+        issues = self.validate_mapping([selected_group])
+        if issues is None or not (issues.has_errors() or issues.uncovered):
+            return True
+        answer = QMessageBox.warning(
+            self, "Check Mapping",
+            f"The mapping of this template has problems:\n\n{issues.details(10)}\n\nExport anyway?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No
+        )
+        return answer == QMessageBox.StandardButton.Yes
+
+    # ------------------ MAPPING FILE ------------------
+
+    def save_mapping(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Mapping", "", "Mapping Files (*.json)")
+        if not file_path:
+            return
+        try:
+            self.mapping.save(file_path)
+        except OSError as e:
+            self.show_error(f"Error writing mapping: {e}")
+
+    def load_mapping(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Mapping", "", "Mapping Files (*.json)")
+        if not file_path:
+            return
+        try:
+            self.mapping = bom_engine.load_mapping(file_path, self.product_info_map)
+        except bom_engine.EngineError as e:
+            self.show_error(str(e))
+            return
+        self.populate_attributes()
 
     # ------------------ GENERATE OUTPUT ------------------
     
@@ -386,14 +848,107 @@ class AttributeMapper(QWidget):
         bom_type_combo.addItem("Kit")
         layout.addWidget(bom_type_combo)
 
+        delta_check = QCheckBox("Only export BoMs changed since a previous export")
+        delta_check.setToolTip(
+            "Compare against a previous export (or its .manifest.json) and write only new or changed BoMs,\n"
+            "plus a list of variants whose BoM should be removed."
+        )
+        layout.addWidget(delta_check)
+
+        multi_check = QCheckBox("Include the BoMs of sub-assemblies (multi-level)")
+        multi_check.setToolTip(
+            "Also generate the BoMs of the components marked as sub-assemblies, and of theirs,\n"
+            "before the BoMs that use them."
+        )
+        multi_check.setChecked(bool(self.mapping.subassemblies))
+        layout.addWidget(multi_check)
+        flatten_check = QCheckBox("Also write the flattened raw-material requirements")
+        flatten_check.setToolTip(
+            "Per variant, the bought components and raw materials of one BoM through all its sub-assemblies\n"
+            "(<name>_raw_materials.csv next to the export)."
+        )
+        flatten_check.setEnabled(multi_check.isChecked())
+        multi_check.toggled.connect(flatten_check.setEnabled)
+        layout.addWidget(flatten_check)
+
+        target_label = QLabel("Output:")
+        layout.addWidget(target_label)
+        target_combo = QComboBox()
+        target_combo.addItem("CSV file", "csv")
+        target_combo.addItem("Excel file (.xlsx)", "xlsx")
+        target_combo.addItem("Odoo (XML-RPC)", "odoo")
+        layout.addWidget(target_combo)
+
+        # Large exports can be split for Odoo's importer; a BoM is never cut across files
+        split_layout = QHBoxLayout()
+        split_check = QCheckBox("Split into files of")
+        split_layout.addWidget(split_check)
+        split_spin = QSpinBox()
+        split_spin.setRange(1, 1000000)
+        split_spin.setValue(DEFAULT_CHUNK_BOMS)
+        split_spin.setSuffix(" BoMs")
+        split_spin.setEnabled(False)
+        split_check.toggled.connect(split_spin.setEnabled)
+        split_layout.addWidget(split_spin)
+        split_layout.addStretch()
+        layout.addLayout(split_layout)
+
+        # Connection settings for a direct import; remembered for the session, never the password
+        odoo_box = QWidget()
+        odoo_form = QFormLayout(odoo_box)
+        odoo_form.setContentsMargins(0, 0, 0, 0)
+        url_input = QLineEdit(self.odoo_settings.get("url", ""))
+        url_input.setPlaceholderText("https://erp.example.com")
+        db_input = QLineEdit(self.odoo_settings.get("db", ""))
+        user_input = QLineEdit(self.odoo_settings.get("user", ""))
+        password_input = QLineEdit()
+        password_input.setEchoMode(QLineEdit.EchoMode.Password)
+        odoo_form.addRow("URL:", url_input)
+        odoo_form.addRow("Database:", db_input)
+        odoo_form.addRow("User:", user_input)
+        odoo_form.addRow("Password / API key:", password_input)
+        odoo_box.setVisible(False)
+        layout.addWidget(odoo_box)
+
+        def on_target_changed(index):
+            to_odoo = target_combo.itemData(index) == "odoo"
+            odoo_box.setVisible(to_odoo)
+            # Odoo creates every BoM it is sent; delta export and splitting only apply to files
+            delta_check.setEnabled(not to_odoo)
+            flatten_check.setEnabled(not to_odoo and multi_check.isChecked())
+            split_check.setEnabled(not to_odoo)
+            split_spin.setEnabled(not to_odoo and split_check.isChecked())
+            dialog.adjustSize()
+        target_combo.currentIndexChanged.connect(on_target_changed)
+
         buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         layout.addWidget(buttons)
 
         def on_ok():
             selected_qty = qty_spin.value()
             selected_bom_type = bom_type_combo.currentText()
+            file_format = target_combo.currentData()
+            if file_format == "odoo":
+                settings = {"url": url_input.text().strip(), "db": db_input.text().strip(),
+                            "user": user_input.text().strip()}
+                if not all(settings.values()) or not password_input.text():
+                    QMessageBox.warning(dialog, "Odoo", "Please fill in the URL, database, user and password.")
+                    return
+                self.odoo_settings = settings
+                dialog.accept()
+                self.import_to_odoo(selected_qty, selected_bom_type, password_input.text(), multi_check.isChecked())
+                return
+            previous_path = None
+            if delta_check.isChecked():
+                previous_path, _ = QFileDialog.getOpenFileName(
+                    self, "Select Previous Export", "", "Previous Exports (*.csv *.xlsx *.manifest.json)"
+                )
+                if not previous_path:
+                    return
+            chunk_boms = split_spin.value() if split_check.isChecked() else None
             dialog.accept()
-            self.generate_csv(selected_qty, selected_bom_type)
+            self.generate_csv(selected_qty, selected_bom_type, previous_path, file_format, chunk_boms,
+                              multi_check.isChecked(), flatten_check.isEnabled() and flatten_check.isChecked())
 
         def on_cancel():
             dialog.reject()
@@ -402,99 +957,133 @@ class AttributeMapper(QWidget):
         buttons.rejected.connect(on_cancel)
         dialog.exec()
 
-    def generate_csv(self, product_qty, bom_type):
+    def generate_csv(self, product_qty, bom_type, previous_path=None, file_format="csv", chunk_boms=None,
+                     multi_level=False, flatten=False):
         """
         For each variant (in the selected product group), aggregate all components and
-        write a CSV file. The first component row includes BOM header info; subsequent
-        component rows have empty header columns.
+        write a CSV (or XLSX) file. The first component row includes BOM header info;
+        subsequent component rows have empty header columns.
+
+        With previous_path (an earlier export or its manifest), only new or changed
+        BoMs are written, along with a list of variants whose BoM was removed.
+        With chunk_boms, the export is split into numbered files of that many BoMs.
+        With multi_level, the BoMs of the sub-assemblies used come first; flatten
+        also writes each variant's raw-material requirements.
         """
-        if self.variant_data is None:
+        if self.variant_index is None:
             self.show_error("No variant data loaded.")
             return
         selected_group = self.product_group_combo.currentData()
         if not selected_group:
             self.show_error("No product group selected.")
             return
+        if not self.confirm_export(selected_group):
+            return
 
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save BoM CSV", "", "CSV Files (*.csv)")
+        if file_format == "xlsx":
+            file_path, _ = QFileDialog.getSaveFileName(self, "Save BoM Workbook", "", "Excel Files (*.xlsx)")
+        else:
+            file_path, _ = QFileDialog.getSaveFileName(self, "Save BoM CSV", "", "CSV Files (*.csv)")
         if not file_path:
             return
+        if not file_path.lower().endswith("." + file_format):
+            file_path += "." + file_format
 
-        group_variants = self.variant_data[self.variant_data[self.product_group_column] == selected_group]
-        fieldnames = [
-            "product_tmpl_id/id",
-            "product_id/id",
-            "type",
-            "product_qty",
-            "bom_line_ids/product_id/id",
-            "bom_line_ids/product_qty",
-            "bom_line_ids/product_uom_id"
-        ]
+        variants = self.variant_index.iter_variants(selected_group)
+        template_rows = self.variant_index.template_rows.get(selected_group, ())
+        total = len(template_rows)
+        assignments = self.mapping.assignments(selected_group)
+        rules = self.mapping.template_rules.get(selected_group)
 
-        try:
-            with open(file_path, mode="w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-
-                for _, row in group_variants.iterrows():
-                    tmpl_id = str(row.get(self.product_group_column, ""))
-                    variant_id = str(row.get(self.variant_id_column, ""))
-
-                    # Parse attribute-value pairs
-                    raw_variants = str(row[self.variant_column]).split(",")
-                    av_pairs = []
-                    for item in raw_variants:
-                        item = item.strip()
-                        if not item:
-                            continue
-                        if ": " in item:
-                            attr, val = item.split(": ", 1)
-                        else:
-                            attr, val = "Unknown", item
-                        av_pairs.append((attr, val))
-
-                    # Gather all components
-                    all_components = []
-                    for (attr, val) in av_pairs:
-                        if (attr, val) in self.components_map:
-                            all_components.extend(self.components_map[(attr, val)])
-                    
-                    if not all_components:
-                        continue
-
-                    first_line = True
-                    for comp in all_components:
-                        selected_product = comp['combo'].currentText()
-                        component_qty = comp['qty'].value()
-                        product_info = self.product_info_map.get(selected_product, {})
-                        comp_product_id = product_info.get('id', "")
-                        comp_uom_id = product_info.get('uom_id', "")
-
-                        if first_line:
-                            writer.writerow({
-                                "product_tmpl_id/id": tmpl_id,
-                                "product_id/id": variant_id,
-                                "type": bom_type,
-                                "product_qty": product_qty,
-                                "bom_line_ids/product_id/id": comp_product_id,
-                                "bom_line_ids/product_qty": component_qty,
-                                "bom_line_ids/product_uom_id": comp_uom_id
-                            })
-                            first_line = False
-                        else:
-                            writer.writerow({
-                                "product_tmpl_id/id": "",
-                                "product_id/id": "",
-                                "type": "",
-                                "product_qty": "",
-                                "bom_line_ids/product_id/id": comp_product_id,
-                                "bom_line_ids/product_qty": component_qty,
-                                "bom_line_ids/product_uom_id": comp_uom_id
-                            })
-
-            QMessageBox.information(self, "Success", f"CSV file generated:\n{file_path}")
-        except Exception as e:
-            self.show_error(f"Error writing CSV: {e}")
+        def generate(progress, is_cancelled):
+            previous = bom_engine.read_manifest(previous_path) if previous_path else None
+            # Progress is reported per variant; the target file only appears once complete
+            with profiling.stage("bom_generation") as record:
+                if multi_level or flatten:
+                    expander = bom_engine.BomExpander(self.variant_index, self.mapping, product_qty)
+                if multi_level:
+                    rows = expander.iter_bom_rows(template_rows, bom_type, progress, is_cancelled)
+                else:
+                    tracked = bom_engine.track_progress(variants, total, progress, is_cancelled)
+                    template_rules = bom_engine.TemplateRules(self.variant_index, selected_group, rules)
+                    rows = bom_engine.iter_bom_rows(tracked, assignments, product_qty, bom_type, template_rules)
+                bom_count, removed, paths = bom_engine.write_bom_export(file_path, rows, previous, chunk_boms)
+                record["rows"] = bom_count
+            if flatten:
+                with profiling.stage("raw_materials", len(template_rows)):
+                    bom_engine.write_requirements_csv(
+                        bom_engine.requirements_path(file_path), expander.requirements(template_rows)
+                    )
+            return bom_count, removed, paths
+
+        def generated(result):
+            bom_count, removed, paths = result
+            if chunk_boms:
+                message = (
+                    f"{bom_count} BoMs generated in {len(paths)} file(s):\n{paths[0]}"
+                    + (f"\n...\n{paths[-1]}" if len(paths) > 1 else "")
+                )
+            else:
+                message = f"{file_format.upper()} file generated ({bom_count} BoMs):\n{file_path}"
+            if previous_path:
+                message += (
+                    f"\n\n{len(removed)} BoM(s) to remove, listed in:\n"
+                    f"{bom_engine.removed_list_path(file_path)}"
+                )
+            if flatten:
+                message += f"\n\nRaw-material requirements:\n{bom_engine.requirements_path(file_path)}"
+            QMessageBox.information(self, "Success", message)
+
+        self.run_in_background("Generating BoMs...", generate, generated)
+
+    def import_to_odoo(self, product_qty, bom_type, password, multi_level=False):
+        """
+        Creates the BoMs of the selected product group (and with multi_level, of
+        its sub-assemblies) directly in Odoo over XML-RPC, using the connection
+        settings entered in the generate dialog.
+        """
+        if self.variant_index is None:
+            self.show_error("No variant data loaded.")
+            return
+        selected_group = self.product_group_combo.currentData()
+        if not selected_group:
+            self.show_error("No product group selected.")
+            return
+        if not self.confirm_export(selected_group):
+            return
+
+        import odoo_rpc
+
+        variants = self.variant_index.iter_variants(selected_group)
+        assignments = self.mapping.assignments(selected_group)
+        rules = self.mapping.template_rules.get(selected_group)
+        settings = self.odoo_settings
+
+        def send(progress, is_cancelled):
+            with profiling.stage("odoo_import") as record:
+                pool = odoo_rpc.ConnectionPool(settings["url"], settings["db"], settings["user"], password)
+                if multi_level:
+                    expander = bom_engine.BomExpander(self.variant_index, self.mapping, product_qty)
+                    rows = expander.iter_bom_rows(self.variant_index.template_rows.get(selected_group, ()), bom_type)
+                else:
+                    template_rules = bom_engine.TemplateRules(self.variant_index, selected_group, rules)
+                    rows = bom_engine.iter_bom_rows(variants, assignments, product_qty, bom_type, template_rules)
+                result = odoo_rpc.import_boms(pool, rows, progress=progress, is_cancelled=is_cancelled)
+                record["rows"] = result["created"]
+            return result
+
+        def sent(result):
+            message = f"{result['created']} BoM(s) created in Odoo ({settings['url']}, {settings['db']})."
+            if result["errors"]:
+                shown = "\n".join(f"{variant_id or '-'}: {error}" for variant_id, error in result["errors"][:20])
+                more = len(result["errors"]) - 20
+                if more > 0:
+                    shown += f"\n... and {more} more"
+                QMessageBox.warning(self, "Odoo Import", f"{message}\n\n{len(result['errors'])} error(s):\n{shown}")
+            else:
+                QMessageBox.information(self, "Success", message)
+
+        self.run_in_background("Importing BoMs into Odoo...", send, sent)
 
     # ------------------ ERROR POPUP ------------------
     
@@ -506,10 +1095,60 @@ class AttributeMapper(QWidget):
         msg.exec()
 
 # ------------------ MAIN LAUNCH ------------------
+def startup_done(report_path=None):
+    """
+    Records the start-up time once the window is shown. With report_path
+    (--startup-check), also writes it with the heavy modules already
+    imported to that file and quits.
+    """
+    record = profiling.profiler.mark("startup", STARTED)
+    if not report_path:
+        return
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "startup_seconds": record["seconds"],
+            "rss_bytes": record["rss_bytes"],
+            "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+            "frozen": bool(getattr(sys, "frozen", False)),
+        }, f, indent=2)
+    QApplication.quit()
+
+
+def parse_arguments(argv):
+    """Profile-mode options; everything else is left for Qt."""
+    parser = argparse.ArgumentParser(description="D.U.M.B - Data Unifier & Management Bot")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="REPORT",
+                        help="Profile mode: write a JSON report of stage timings, memory and UI stalls on exit")
+    parser.add_argument("--cprofile", action="store_true", help="With --profile, also write a cProfile dump (.prof)")
+    parser.add_argument("--startup-check", metavar="REPORT",
+                        help="Quit as soon as the window is shown and write the start-up time to REPORT (JSON)")
+    args, qt_args = parser.parse_known_args(argv[1:])
+    if args.profile is None and os.environ.get("DUMB_PROFILE"):
+        args.profile = "" if os.environ["DUMB_PROFILE"] in ("1", "true", "yes") else os.environ["DUMB_PROFILE"]
+    return args, argv[:1] + qt_args
+
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    # Chunked exports are written by spawned worker processes, also from a frozen build
+    multiprocessing.freeze_support()
+    args, qt_args = parse_arguments(sys.argv)
+    app = QApplication(qt_args)
     window = AttributeMapper()
     window.show()
-    sys.exit(app.exec())
+    # First event-loop turn: the window has been painted
+    QTimer.singleShot(0, lambda: startup_done(args.startup_check))
+    if args.profile is None:
+        sys.exit(app.exec())
+
+    report_path = args.profile or profiling.default_report_path()
+    profiling.profiler.cprofile = args.cprofile
+    window.setWindowTitle(window.windowTitle() + " [profiling]")
+    monitor = EventLoopMonitor(profiling.profiler, window)
+    monitor.start()
+    with profiling.profiler.profile_thread():
+        exit_code = app.exec()
+    profiling.profiler.write_report(report_path)
+    print(f"Profile report written to {report_path}")
+    sys.exit(exit_code)
 
 # ------------------ END or FIN ------------------
\ No newline at end of file
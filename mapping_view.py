@@ -0,0 +1,440 @@
+"""
+Model/view editor for Step 4 (assign components to attribute values).
+
+The tree has three levels: attributes, their values, and the component lines
+assigned to each (attribute, value). Only the rows on screen are ever painted,
+and component lines are edited in place through delegates, so the cost of
+showing a template does not grow with its number of attribute values.
+
+Components that depend on a combination of values are edited as
+CombinationRules in a separate dialog.
+"""
+from PyQt6.QtWidgets import (
+    QStyledItemDelegate, QComboBox, QCompleter, QDoubleSpinBox, QDialog, QVBoxLayout, QHBoxLayout,
+    QFormLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView,
+    QDialogButtonBox, QMessageBox
+)
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex, QStringListModel
+from PyQt6.QtGui import QFont
+
+from bom_engine import ComponentLine, CombinationRule, RULE_ADD, RULE_EXCLUDE, RULE_QTY
+
+PRODUCT_COL = 0
+QTY_COL = 1
+UOM_COL = 2
+SUBASSEMBLY_COL = 3
+
+DEFAULT_COMPONENT_QTY = 1.0
+
+
+class AssignmentModel(QAbstractItemModel):
+    """
+    Tree model of the component assignments of one product template.
+
+    Internal ids: 0 for attribute rows, attribute position + 1 for value rows,
+    and len(attributes) + 1 + global value position for component lines.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.attribute_names = []
+        self.attribute_values = []   # per attribute: list of values
+        self.value_offsets = []      # per attribute: global position of its first value
+        self.value_keys = []         # global position -> (attribute, value)
+        self.value_positions = {}    # (attribute, value) -> global position
+        self.value_attribute_rows = []  # global position -> attribute row
+        # (attribute, value) -> [ComponentLine, ...], owned by the BomMapping
+        self.lines = {}
+        # bom_engine.ProductCatalog: product_name -> (id, uom_id), to resolve edited lines
+        self.product_info_map = {}
+        # Names of the components made as sub-assemblies, owned by the BomMapping
+        self.subassemblies = set()
+
+    # ------------------ CONTENT ------------------
+
+    def set_attributes(self, attributes, assignments, subassemblies=None):
+        """
+        Shows the given { attribute: [values] } with their component lines.
+        assignments is the template's dict in the BomMapping and is edited in place,
+        as is the mapping's set of sub-assembly names.
+        """
+        self.beginResetModel()
+        if subassemblies is not None:
+            self.subassemblies = subassemblies
+        self.attribute_names = sorted(attributes.keys())
+        self.attribute_values = [list(attributes[a]) for a in self.attribute_names]
+        self.value_offsets = []
+        self.value_keys = []
+        self.value_attribute_rows = []
+        for attribute_row, (attribute, values) in enumerate(zip(self.attribute_names, self.attribute_values)):
+            self.value_offsets.append(len(self.value_keys))
+            self.value_keys.extend((attribute, value) for value in values)
+            self.value_attribute_rows.extend([attribute_row] * len(values))
+        self.value_positions = {key: position for position, key in enumerate(self.value_keys)}
+        for key in self.value_keys:
+            assignments.setdefault(key, [])
+        self.lines = assignments
+        self.endResetModel()
+
+    def set_product_info_map(self, product_info_map):
+        """Uses a new product lookup for edited lines and repaints the resolved UoMs."""
+        self.layoutAboutToBeChanged.emit()
+        self.product_info_map = product_info_map
+        self.layoutChanged.emit()
+
+    def value_index(self, key):
+        """Returns the index of the (attribute, value) row, or an invalid index."""
+        position = self.value_positions.get(key)
+        if position is None:
+            return QModelIndex()
+        return self._value_index_at(position)
+
+    def _value_index_at(self, position):
+        attribute_row = self.value_attribute_rows[position]
+        return self.createIndex(position - self.value_offsets[attribute_row], 0, attribute_row + 1)
+
+    def key_for_index(self, index):
+        """Returns the (attribute, value) of a value row or component line, else None."""
+        if not index.isValid() or index.internalId() == 0:
+            return None
+        if index.internalId() <= len(self.attribute_names):
+            attribute_row = index.internalId() - 1
+            return self.value_keys[self.value_offsets[attribute_row] + index.row()]
+        return self.value_keys[index.internalId() - len(self.attribute_names) - 1]
+
+    def is_line(self, index):
+        return index.isValid() and index.internalId() > len(self.attribute_names)
+
+    def add_line(self, key, product_name, qty=DEFAULT_COMPONENT_QTY):
+        """Appends a component line to (attribute, value) and returns its index."""
+        parent = self.value_index(key)
+        lines = self.lines[key]
+        row = len(lines)
+        line = ComponentLine(product_name, qty)
+        line.resolve(self.product_info_map)
+        self.beginInsertRows(parent, row, row)
+        lines.append(line)
+        self.endInsertRows()
+        self._line_count_changed(parent)
+        return self.index(row, PRODUCT_COL, parent)
+
+    def remove_line(self, index):
+        """Removes the component line at index."""
+        if not self.is_line(index):
+            return
+        key = self.key_for_index(index)
+        parent = self.parent(index)
+        self.beginRemoveRows(parent, index.row(), index.row())
+        del self.lines[key][index.row()]
+        self.endRemoveRows()
+        self._line_count_changed(parent)
+
+    def _line_count_changed(self, value_index):
+        count_index = value_index.siblingAtColumn(QTY_COL)
+        self.dataChanged.emit(count_index, count_index)
+
+    # ------------------ QAbstractItemModel ------------------
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        if parent.internalId() == 0:
+            return self.createIndex(row, column, parent.row() + 1)
+        position = self.value_offsets[parent.internalId() - 1] + parent.row()
+        return self.createIndex(row, column, len(self.attribute_names) + 1 + position)
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        if index.internalId() <= len(self.attribute_names):
+            return self.createIndex(index.internalId() - 1, 0, 0)
+        return self._value_index_at(index.internalId() - len(self.attribute_names) - 1)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.attribute_names)
+        if parent.column() != 0:
+            return 0
+        if parent.internalId() == 0:
+            return len(self.attribute_values[parent.row()])
+        if parent.internalId() <= len(self.attribute_names):
+            return len(self.lines[self.key_for_index(parent)])
+        return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 4
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation != Qt.Orientation.Horizontal:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return ["Attribute / Value / Component", "Qty", "UoM", "Sub-assembly"][section]
+        if role == Qt.ItemDataRole.ToolTipRole and section == SUBASSEMBLY_COL:
+            return "Made in-house from its own variant BoM, generated with multi-level output"
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+
+        # Attribute rows
+        if index.internalId() == 0:
+            if role == Qt.ItemDataRole.DisplayRole and column == 0:
+                return self.attribute_names[index.row()]
+            if role == Qt.ItemDataRole.FontRole:
+                font = QFont()
+                font.setBold(True)
+                return font
+            return None
+
+        # Value rows
+        if index.internalId() <= len(self.attribute_names):
+            if role == Qt.ItemDataRole.DisplayRole:
+                key = self.key_for_index(index)
+                if column == 0:
+                    return key[1]
+                if column == QTY_COL and self.lines[key]:
+                    return f"{len(self.lines[key])} component(s)"
+            return None
+
+        # Component lines
+        line = self.lines[self.key_for_index(index)][index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if column == PRODUCT_COL:
+                return line.product_name
+            if column == QTY_COL:
+                return line.qty if role == Qt.ItemDataRole.EditRole else f"{line.qty:.2f}"
+            if column == UOM_COL:
+                return line.uom_id
+        if role == Qt.ItemDataRole.CheckStateRole and column == SUBASSEMBLY_COL:
+            if line.product_name in self.subassemblies:
+                return Qt.CheckState.Checked
+            return Qt.CheckState.Unchecked
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not self.is_line(index):
+            return False
+        line = self.lines[self.key_for_index(index)][index.row()]
+        if role == Qt.ItemDataRole.CheckStateRole and index.column() == SUBASSEMBLY_COL:
+            # Marks the product, not the line: every line of it shows the change
+            self.layoutAboutToBeChanged.emit()
+            if Qt.CheckState(value) == Qt.CheckState.Checked:
+                self.subassemblies.add(line.product_name)
+            else:
+                self.subassemblies.discard(line.product_name)
+            self.layoutChanged.emit()
+            return True
+        if role != Qt.ItemDataRole.EditRole:
+            return False
+        if index.column() == PRODUCT_COL:
+            line.product_name = str(value)
+            # Resolve the ids once, here, rather than at every generation
+            line.resolve(self.product_info_map)
+            self.dataChanged.emit(index, index.siblingAtColumn(UOM_COL))
+            return True
+        if index.column() == QTY_COL:
+            line.qty = float(value)
+            self.dataChanged.emit(index, index)
+            return True
+        return False
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if self.is_line(index) and index.column() in (PRODUCT_COL, QTY_COL):
+            flags |= Qt.ItemFlag.ItemIsEditable
+        if self.is_line(index) and index.column() == SUBASSEMBLY_COL:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+
+# ------------------ DELEGATES ------------------
+
+class ProductCompleter(QCompleter):
+    """
+    Completer showing the ranked matches of search(text) for the text typed in
+    a product combo, instead of filtering the whole product list itself.
+    """
+
+    def __init__(self, search, combo):
+        super().__init__(combo)
+        self.search = search
+        self.combo = combo
+        self.matches = QStringListModel(self)
+        self.setModel(self.matches)
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        combo.setCompleter(self)
+        combo.lineEdit().textEdited.connect(self.update_matches)
+        self.activated[str].connect(combo.setEditText)
+
+    def update_matches(self, text):
+        self.matches.setStringList(self.search(text) if text.strip() else [])
+        if self.matches.rowCount():
+            self.complete()
+        else:
+            self.popup().hide()
+
+
+def product_combo(product_model, search, parent=None):
+    """Editable combo over the shared product model, completed through search(text)."""
+    combo = QComboBox(parent)
+    combo.setEditable(True)
+    combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+    combo.setModel(product_model)
+    ProductCompleter(search, combo)
+    return combo
+
+
+class ProductDelegate(QStyledItemDelegate):
+    """
+    Edits a component line's product with a combo over the shared product model.
+    search(text) returns the product names offered while typing.
+    """
+
+    def __init__(self, product_model, search, parent=None):
+        super().__init__(parent)
+        self.product_model = product_model
+        self.search = search
+
+    def createEditor(self, parent, option, index):
+        combo = product_combo(self.product_model, self.search, parent)
+        # Commit as soon as a product is picked from the list or the search results
+        combo.activated.connect(lambda _: self.commitData.emit(combo))
+        combo.completer().activated[str].connect(lambda _: self.commitData.emit(combo))
+        return combo
+
+    def setEditorData(self, editor, index):
+        product_name = index.data(Qt.ItemDataRole.EditRole) or ""
+        position = editor.findText(product_name)
+        if position >= 0:
+            editor.setCurrentIndex(position)
+        else:
+            editor.setEditText(product_name)
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText(), Qt.ItemDataRole.EditRole)
+
+
+class QtyDelegate(QStyledItemDelegate):
+    """Edits a component line's quantity with a spin box."""
+
+    def createEditor(self, parent, option, index):
+        qty_input = QDoubleSpinBox(parent)
+        qty_input.setDecimals(2)
+        qty_input.setRange(0.01, 10000)
+        return qty_input
+
+    def setEditorData(self, editor, index):
+        editor.setValue(float(index.data(Qt.ItemDataRole.EditRole) or DEFAULT_COMPONENT_QTY))
+
+    def setModelData(self, editor, model, index):
+        editor.interpretText()
+        model.setData(index, editor.value(), Qt.ItemDataRole.EditRole)
+
+
+# ------------------ COMBINATION RULES ------------------
+
+RULE_ACTIONS = [
+    (RULE_ADD, "Add component"),
+    (RULE_EXCLUDE, "Exclude component"),
+    (RULE_QTY, "Set component qty"),
+]
+ANY_VALUE = "(any)"
+
+
+class RulesDialog(QDialog):
+    """
+    Lists and edits the CombinationRules of one template. `rules` is the
+    template's list in the BomMapping and is edited in place.
+    """
+
+    def __init__(self, attributes, rules, product_model, search, product_info_map, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Combination Rules")
+        self.resize(800, 500)
+        self.rules = rules
+        self.product_info_map = product_info_map
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel(
+            "Rules apply to variants having all the selected values, after the per-value components:\n"
+            "components are added first, then excluded, then their quantity is set (most specific rule wins)."
+        ))
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["When", "Action", "Component", "Qty"])
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+
+        remove_btn = QPushButton("Remove Rule")
+        remove_btn.clicked.connect(self.remove_rule)
+        layout.addWidget(remove_btn, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        # New rule: one value picker per attribute, then the action
+        form = QFormLayout()
+        self.condition_combos = []
+        for attribute in sorted(attributes):
+            combo = QComboBox()
+            combo.addItem(ANY_VALUE)
+            combo.addItems(attributes[attribute])
+            form.addRow(f"{attribute}:", combo)
+            self.condition_combos.append((attribute, combo))
+        self.action_combo = QComboBox()
+        for kind, label in RULE_ACTIONS:
+            self.action_combo.addItem(label, kind)
+        form.addRow("Action:", self.action_combo)
+        self.product_input = product_combo(product_model, search)
+        form.addRow("Component:", self.product_input)
+        self.qty_input = QDoubleSpinBox()
+        self.qty_input.setDecimals(2)
+        self.qty_input.setRange(0.01, 10000)
+        self.qty_input.setValue(1.0)
+        form.addRow("Qty:", self.qty_input)
+        layout.addLayout(form)
+
+        new_rule_buttons = QHBoxLayout()
+        add_btn = QPushButton("Add Rule")
+        add_btn.clicked.connect(self.add_rule)
+        new_rule_buttons.addWidget(add_btn)
+        new_rule_buttons.addStretch()
+        layout.addLayout(new_rule_buttons)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(self.accept)
+        layout.addWidget(buttons)
+
+        self.refresh()
+
+    def refresh(self):
+        labels = dict(RULE_ACTIONS)
+        self.table.setRowCount(len(self.rules))
+        for row, rule in enumerate(self.rules):
+            qty = "" if rule.kind == RULE_EXCLUDE else f"{rule.line.qty:.2f}"
+            for column, text in enumerate([rule.describe(), labels[rule.kind], rule.line.product_name, qty]):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+
+    def add_rule(self):
+        conditions = [
+            (attribute, combo.currentText())
+            for attribute, combo in self.condition_combos if combo.currentText() != ANY_VALUE
+        ]
+        if not conditions:
+            QMessageBox.warning(self, "Combination Rules", "Select at least one attribute value.")
+            return
+        line = ComponentLine(self.product_input.currentText(), self.qty_input.value())
+        line.resolve(self.product_info_map)
+        self.rules.append(CombinationRule(conditions, self.action_combo.currentData(), line))
+        self.refresh()
+
+    def remove_rule(self):
+        rows = sorted({index.row() for index in self.table.selectedIndexes()}, reverse=True)
+        for row in rows:
+            del self.rules[row]
+        self.refresh()
@@ -0,0 +1,291 @@
+"""
+Direct BoM import into Odoo over XML-RPC.
+
+Instead of writing a CSV and uploading it through Odoo's import screen, BoMs
+are created with mrp.bom create() calls. BoMs are sent in configurable
+batches over a small pool of reused connections, batches lost to a network
+error are retried without creating any BoM twice, and the external ids / UoM names carried by the components export are
+resolved to database ids once, in bulk, before anything is sent.
+"""
+import time
+import queue
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+
+import bom_engine
+
+# BoM type labels used in the tool -> mrp.bom 'type' selection values
+BOM_TYPE_CODES = {
+    "Manufacture this product": "normal",
+    "Kit": "phantom",
+}
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_POOL_SIZE = 4
+DEFAULT_RETRIES = 3
+# Seconds a call may take before the connection counts as lost
+DEFAULT_TIMEOUT = 300
+# ir.model.data / uom.uom lookups per call
+LOOKUP_CHUNK = 1000
+
+
+class OdooError(Exception):
+    """Raised when Odoo cannot be reached, refuses the login or an import fails."""
+
+
+# ------------------ CONNECTIONS ------------------
+
+class _TimeoutTransport(xmlrpc.client.Transport):
+    """HTTP transport whose connections give up after `timeout` seconds without an answer."""
+
+    def __init__(self, timeout, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+class _SafeTimeoutTransport(xmlrpc.client.SafeTransport):
+    """HTTPS counterpart of _TimeoutTransport."""
+
+    def __init__(self, timeout, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+def _server_proxy(url, timeout):
+    transport_class = _SafeTimeoutTransport if url.lower().startswith("https:") else _TimeoutTransport
+    return xmlrpc.client.ServerProxy(url, transport=transport_class(timeout), allow_none=True)
+
+
+class OdooConnection:
+    """One authenticated XML-RPC session; the HTTP connection is kept alive between calls."""
+
+    def __init__(self, url, db, username, password, timeout=DEFAULT_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.db = db
+        self.password = password
+        self.common = _server_proxy(f"{self.url}/xmlrpc/2/common", timeout)
+        self.models = _server_proxy(f"{self.url}/xmlrpc/2/object", timeout)
+        try:
+            self.uid = self.common.authenticate(db, username, password, {})
+        except (OSError, xmlrpc.client.Error) as e:
+            raise OdooError(f"Cannot connect to Odoo at {self.url}: {e}")
+        if not self.uid:
+            raise OdooError("Odoo login failed: check the database, user and password/API key")
+
+    def execute(self, model, method, *args, **kwargs):
+        return self.models.execute_kw(self.db, self.uid, self.password, model, method, list(args), kwargs)
+
+
+class ConnectionPool:
+    """A fixed set of OdooConnections shared by the import threads."""
+
+    def __init__(self, url, db, username, password, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.connections = queue.Queue()
+        for _ in range(max(size, 1)):
+            self.connections.put(OdooConnection(url, db, username, password, timeout))
+        self.size = max(size, 1)
+
+    def execute(self, model, method, *args, **kwargs):
+        connection = self.connections.get()
+        try:
+            return connection.execute(model, method, *args, **kwargs)
+        finally:
+            self.connections.put(connection)
+
+
+# ------------------ ID RESOLUTION ------------------
+
+def split_xml_id(xml_id):
+    """'__export__.product_template_12' -> ('__export__', 'product_template_12')."""
+    if "." in xml_id:
+        module, name = xml_id.split(".", 1)
+        return module, name
+    # Ids without a module are created by Odoo's importer under __import__
+    return "__import__", xml_id
+
+
+def resolve_xml_ids(pool, xml_ids):
+    """Returns { xml_id: database id } for the external ids Odoo knows about."""
+    by_name = {}
+    for xml_id in set(xml_ids):
+        module, name = split_xml_id(xml_id)
+        by_name.setdefault(name, []).append((module, xml_id))
+
+    resolved = {}
+    names = list(by_name)
+    modules = sorted({module for pairs in by_name.values() for module, _ in pairs})
+    for start in range(0, len(names), LOOKUP_CHUNK):
+        records = pool.execute(
+            "ir.model.data", "search_read",
+            [("module", "in", modules), ("name", "in", names[start:start + LOOKUP_CHUNK])],
+            fields=["module", "name", "res_id"],
+        )
+        for record in records:
+            for module, xml_id in by_name.get(record["name"], ()):
+                if module == record["module"]:
+                    resolved[xml_id] = record["res_id"]
+    return resolved
+
+
+def resolve_uoms(pool, uom_names):
+    """Returns { uom name: database id } for units of measure exported by name."""
+    resolved = {}
+    names = list(set(uom_names))
+    for start in range(0, len(names), LOOKUP_CHUNK):
+        records = pool.execute(
+            "uom.uom", "search_read", [("name", "in", names[start:start + LOOKUP_CHUNK])], fields=["name"]
+        )
+        for record in records:
+            resolved.setdefault(record["name"], record["id"])
+    return resolved
+
+
+# ------------------ IMPORT ------------------
+
+def bom_values(blocks, xml_ids, uoms):
+    """
+    Turns BoM row blocks into mrp.bom create() values.
+    Returns (values, errors) where errors lists (variant_id, message).
+    """
+    values, errors = [], []
+    for variant_id, block in blocks:
+        header = block[0]
+        tmpl_xml_id, _, bom_type, product_qty = header[:4]
+        missing = [x for x in (tmpl_xml_id, variant_id) if x not in xml_ids]
+        lines = []
+        for row in block:
+            product_xml_id, qty, uom = row[4], row[5], row[6]
+            if product_xml_id not in xml_ids:
+                missing.append(product_xml_id or "<unknown component>")
+                continue
+            line = {"product_id": xml_ids[product_xml_id], "product_qty": float(qty)}
+            uom_id = xml_ids.get(uom) or uoms.get(uom)
+            if uom_id:
+                line["product_uom_id"] = uom_id
+            lines.append((0, 0, line))
+        if missing:
+            errors.append((variant_id, f"Unknown in Odoo: {', '.join(sorted(set(missing)))}"))
+            continue
+        values.append({
+            "product_tmpl_id": xml_ids[tmpl_xml_id],
+            "product_id": xml_ids[variant_id],
+            "type": BOM_TYPE_CODES.get(bom_type, bom_type),
+            "product_qty": float(product_qty),
+            "bom_line_ids": lines,
+        })
+    return values, errors
+
+
+def last_bom_id(pool):
+    """Highest mrp.bom id in the database (archived BoMs included), 0 when there is none."""
+    ids = pool.execute("mrp.bom", "search", [("active", "in", [True, False])], order="id desc", limit=1)
+    return ids[0] if ids else 0
+
+
+def _created_since(pool, batch, since_id):
+    """{ product id: BoM id } of the batch's variants that got a BoM with an id above since_id."""
+    records = pool.execute(
+        "mrp.bom", "search_read",
+        [("product_id", "in", [values["product_id"] for values in batch]), ("id", ">", since_id)],
+        fields=["product_id"],
+    )
+    return {record["product_id"][0]: record["id"] for record in records if record["product_id"]}
+
+
+def _create_batch(pool, batch, retries, since_id=0):
+    """
+    Creates one batch of BoMs and returns the new ids. Network errors are
+    retried with a growing delay; Odoo may have committed the batch before the
+    reply was lost, so before each retry the BoMs created since since_id (see
+    last_bom_id) are looked up and only the missing ones are sent again.
+    Errors reported by Odoo itself (Faults, e.g. a validation error) are not
+    retried.
+    """
+    created = []
+    for attempt in range(retries + 1):
+        try:
+            if attempt:
+                existing = _created_since(pool, batch, since_id)
+                created.extend(existing.values())
+                batch = [values for values in batch if values["product_id"] not in existing]
+                if not batch:
+                    return created
+            return created + pool.execute("mrp.bom", "create", batch)
+        except xmlrpc.client.Fault as e:
+            raise OdooError(f"Batch of {len(batch)} BoMs refused by Odoo: {e.faultString}")
+        except (OSError, xmlrpc.client.Error) as e:
+            if attempt == retries:
+                raise OdooError(f"Batch of {len(batch)} BoMs failed after {retries + 1} attempts: {e}")
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def import_boms(pool, rows, batch_size=DEFAULT_BATCH_SIZE, retries=DEFAULT_RETRIES,
+                progress=None, is_cancelled=None):
+    """
+    Creates the BoMs described by BoM rows (as from bom_engine.iter_bom_rows) in Odoo.
+
+    Batches of `batch_size` BoMs are sent concurrently over the pool's
+    connections. progress(done, total) is called per finished batch;
+    when is_cancelled() returns True, batches not yet sent are skipped and
+    reported in the errors.
+
+    Returns { 'created': n, 'errors': [(variant_id or None, message), ...] }.
+    """
+    progress = progress or (lambda done, total: None)
+    is_cancelled = is_cancelled or (lambda: False)
+
+    blocks = list(bom_engine.iter_bom_blocks(rows))
+    xml_ids, uom_names = set(), set()
+    for variant_id, block in blocks:
+        xml_ids.update((block[0][0], variant_id))
+        for row in block:
+            xml_ids.add(row[4])
+            uom_names.add(row[6])
+    xml_ids.discard("")
+    uom_names.discard("")
+
+    resolved = resolve_xml_ids(pool, xml_ids | {u for u in uom_names if "." in u})
+    uoms = resolve_uoms(pool, uom_names)
+    values, errors = bom_values(blocks, resolved, uoms)
+
+    batches = [values[i:i + batch_size] for i in range(0, len(values), batch_size)]
+    # BoMs above this id were created by this import, for retries to skip
+    since_id = last_bom_id(pool) if batches else 0
+    created = 0
+    done = 0
+
+    def send(batch):
+        # Batches not yet started when the user cancels are skipped, not sent
+        if is_cancelled():
+            return None
+        return len(_create_batch(pool, batch, retries, since_id))
+
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        futures = [executor.submit(send, batch) for batch in batches]
+        for future, batch in zip(futures, batches):
+            try:
+                count = future.result()
+            except OdooError as e:
+                errors.append((None, str(e)))
+            else:
+                if count is None:
+                    skipped += len(batch)
+                else:
+                    created += count
+            done += len(batch)
+            progress(done, len(values))
+
+    if skipped:
+        errors.append((None, f"Cancelled: {skipped} BoMs were not sent"))
+    return {"created": created, "errors": errors}
@@ -0,0 +1,162 @@
+"""
+Component search index for the product pickers.
+
+Built once per components file, then queried on every keystroke. A query
+is matched in decreasing order of relevance as:
+    1. a prefix of the product name,
+    2. word prefixes, every query word matching a word of the name,
+    3. a substring anywhere in the name,
+    4. words with one typo (insertion, deletion, substitution or swap).
+Within a tier, shorter names rank first. Word postings are stored as one
+flat array over a sorted vocabulary, so all words starting with a prefix are
+a single contiguous slice and matching costs a few array operations per
+query word instead of a scan of the catalogue.
+"""
+import re
+import sys
+import bisect
+
+import numpy as np
+
+from bom_engine import object_bytes
+
+DEFAULT_LIMIT = 50
+# Words shorter than this are not matched with typos
+MIN_TYPO_LENGTH = 4
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text):
+    return _WORD.findall(text.casefold())
+
+
+def _deletions(word):
+    """The word itself and every variant with one character removed."""
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class ProductSearchIndex:
+    """Ranked lookup over a list of product names."""
+
+    def __init__(self, names):
+        self.names = sorted(set(names), key=str.casefold)
+        self.folded = [name.casefold() for name in self.names]
+        # Name lengths, for ranking
+        self.lengths = np.fromiter((len(name) for name in self.names), dtype=np.int32, count=len(self.names))
+
+        # One line per name, for substring scans. Offsets come from the folded
+        # names, which can be longer than the originals ('ß' folds to 'ss')
+        self.haystack = "\n".join(self.folded) + "\n"
+        self.line_starts = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(
+            np.fromiter((len(folded) + 1 for folded in self.folded), dtype=np.int64, count=len(self.folded)),
+            out=self.line_starts[1:]
+        )
+
+        # Sorted vocabulary; postings[offsets[w]:offsets[w + 1]] are the names containing word w
+        word_names = {}
+        for position, folded in enumerate(self.folded):
+            for word in set(_words(folded)):
+                word_names.setdefault(word, []).append(position)
+        self.vocabulary = sorted(word_names)
+        counts = np.fromiter((len(word_names[w]) for w in self.vocabulary), dtype=np.int64,
+                             count=len(self.vocabulary))
+        self.offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.postings = np.fromiter(
+            (position for word in self.vocabulary for position in word_names[word]),
+            dtype=np.int32, count=int(self.offsets[-1])
+        )
+
+        # Symmetric deletion index for typo matching: deletion -> vocabulary positions.
+        # Numbers and short words are left out, they are matched exactly or by prefix.
+        self.deletions = {}
+        for word_position, word in enumerate(self.vocabulary):
+            if len(word) >= MIN_TYPO_LENGTH and word.isalpha():
+                for deletion in _deletions(word):
+                    self.deletions.setdefault(deletion, []).append(word_position)
+        self._memory_bytes = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def memory_bytes(self):
+        """Approximate memory held by the index (computed once)."""
+        if self._memory_bytes is None:
+            self._memory_bytes = (
+                object_bytes(self.names) + object_bytes(self.folded) + sys.getsizeof(self.haystack)
+                + self.lengths.nbytes + self.line_starts.nbytes + self.offsets.nbytes + self.postings.nbytes
+                + object_bytes(self.vocabulary) + sys.getsizeof(self.deletions)
+                + sum(object_bytes(words) for words in self.deletions.values())
+            )
+        return self._memory_bytes
+
+    # ------------------ MATCHING ------------------
+
+    def _prefix_range(self, sorted_list, prefix):
+        lo = bisect.bisect_left(sorted_list, prefix)
+        hi = bisect.bisect_left(sorted_list, prefix + "\U0010ffff")
+        return lo, hi
+
+    def _word_mask(self, word, typos):
+        """Boolean mask of the names having a word that starts with `word` (or is one typo away)."""
+        mask = np.zeros(len(self.names), dtype=bool)
+        lo, hi = self._prefix_range(self.vocabulary, word)
+        mask[self.postings[self.offsets[lo]:self.offsets[hi]]] = True
+        if typos and len(word) >= MIN_TYPO_LENGTH:
+            for deletion in _deletions(word):
+                for word_position in self.deletions.get(deletion, ()):
+                    mask[self.postings[self.offsets[word_position]:self.offsets[word_position + 1]]] = True
+        return mask
+
+    def _words_match(self, words, typos):
+        mask = self._word_mask(words[0], typos)
+        for word in words[1:]:
+            mask &= self._word_mask(word, typos)
+        return self._by_length(np.flatnonzero(mask))
+
+    def _by_length(self, positions):
+        return positions[np.argsort(self.lengths[positions], kind="stable")]
+
+    def _substring_match(self, query, limit):
+        """Names containing query, in alphabetical order, stopping after `limit`."""
+        positions = []
+        start = self.haystack.find(query)
+        while start >= 0 and len(positions) < limit:
+            position = int(np.searchsorted(self.line_starts, start, side="right")) - 1
+            positions.append(position)
+            # Continue after this name
+            start = self.haystack.find(query, int(self.line_starts[position + 1]))
+        return positions
+
+    # ------------------ SEARCH ------------------
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Returns up to `limit` product names matching query, best first."""
+        query = query.casefold().strip()
+        if not query:
+            return self.names[:limit]
+
+        ranked = []
+        seen = set()
+
+        def take(positions):
+            for position in positions:
+                if position not in seen:
+                    seen.add(position)
+                    ranked.append(position)
+                    if len(ranked) >= limit:
+                        return True
+            return False
+
+        lo, hi = self._prefix_range(self.folded, query)
+        words = _words(query)
+        done = take(self._by_length(np.arange(lo, hi)).tolist())
+        if not done and words:
+            done = take(self._words_match(words, typos=False).tolist())
+        if not done and "\n" not in query:
+            done = take(self._substring_match(query, limit))
+        if not done and words:
+            take(self._words_match(words, typos=True).tolist())
+        return [self.names[position] for position in ranked]
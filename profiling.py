@@ -0,0 +1,230 @@
+"""
+Stage timing and memory instrumentation for D.U.M.B.
+
+Every slow step of the tool (file load, variant parsing, dropdown and tree
+population, component lines, generation) runs inside stage(), which records
+its duration, row count and the process memory before and after. Recording
+is always on and cheap; in profile mode (--profile or DUMB_PROFILE=1) the
+GUI also watches its event loop for stalls and writes everything to one JSON
+report on exit, optionally with a cProfile dump next to it, so a slow session
+can be diagnosed from the attached files.
+"""
+import os
+import sys
+import json
+import time
+import cProfile
+import platform
+import threading
+import collections
+from contextlib import contextmanager
+
+# Stage records kept in memory; older ones are dropped first
+MAX_RECORDS = 10000
+
+
+# ------------------ PROCESS MEMORY ------------------
+
+def _windows_memory_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+
+def current_rss():
+    """Resident memory of this process in bytes, or None where it cannot be read."""
+    try:
+        if sys.platform == "win32":
+            counters = _windows_memory_counters()
+            return counters.WorkingSetSize if counters else None
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes, or None where it cannot be read."""
+    try:
+        if sys.platform == "win32":
+            counters = _windows_memory_counters()
+            return counters.PeakWorkingSetSize if counters else None
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError, ValueError, AttributeError):
+        return None
+
+
+# ------------------ PROFILER ------------------
+
+class Profiler:
+    """
+    Collects stage records and event-loop stalls for one session. Stages can
+    be recorded from any thread.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.records = collections.deque(maxlen=MAX_RECORDS)
+        self.stalls = collections.deque(maxlen=MAX_RECORDS)
+        # cProfile profiles of finished threads/tasks, when cProfile is on
+        self.cprofile = False
+        self.profiles = []
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Times the enclosed block as stage `name`. The yielded record can be
+        updated, e.g. record['rows'] = len(data) once the row count is known.
+        """
+        record = {"stage": name, "thread": threading.current_thread().name, "rows": rows}
+        rss_before = current_rss()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            end = time.perf_counter()
+            rss_after = current_rss()
+            record.update(
+                start=round(start - self.origin, 4),
+                seconds=round(end - start, 4),
+                rss_bytes=rss_after,
+                rss_delta_bytes=(rss_after - rss_before) if rss_after is not None and rss_before is not None else None,
+                peak_rss_bytes=peak_rss(),
+            )
+            with self.lock:
+                self.records.append(record)
+
+    def mark(self, name, start, rows=None):
+        """Records stage `name` as having run from perf_counter() `start` until now."""
+        end = time.perf_counter()
+        rss = current_rss()
+        record = {
+            "stage": name, "thread": threading.current_thread().name, "rows": rows,
+            "start": round(start - self.origin, 4), "seconds": round(end - start, 4),
+            "rss_bytes": rss, "rss_delta_bytes": None, "peak_rss_bytes": peak_rss(),
+        }
+        with self.lock:
+            self.records.append(record)
+        return record
+
+    def record_stall(self, start, seconds):
+        """Records that the GUI event loop did not run from perf_counter() `start` for `seconds`."""
+        with self.lock:
+            self.stalls.append({"start": round(start - self.origin, 4), "seconds": round(seconds, 4)})
+
+    @contextmanager
+    def profile_thread(self):
+        """
+        Runs the enclosed block under cProfile when cProfile is on (one profile
+        per thread/task). From Python 3.12 only one profiler can be active per
+        interpreter and it sees every thread, so a task started while the GUI
+        thread is profiled runs under that profiler instead of its own.
+        """
+        if not self.cprofile:
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 'Another profiling tool is already active'
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self.lock:
+                self.profiles.append(profile)
+
+    # ------------------ REPORT ------------------
+
+    def summary(self):
+        """Per stage: count, total / max seconds and rows."""
+        stages = {}
+        with self.lock:
+            records = list(self.records)
+        for record in records:
+            entry = stages.setdefault(record["stage"], {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                                                        "rows": 0})
+            entry["count"] += 1
+            entry["total_seconds"] = round(entry["total_seconds"] + record["seconds"], 4)
+            entry["max_seconds"] = max(entry["max_seconds"], record["seconds"])
+            entry["rows"] += record["rows"] or 0
+        return stages
+
+    def report(self):
+        """The whole session as a JSON-serialisable dict."""
+        with self.lock:
+            records = list(self.records)
+            stalls = [dict(stall) for stall in self.stalls]
+        # Name the GUI-thread stages that overlap each stall
+        for stall in stalls:
+            stall_end = stall["start"] + stall["seconds"]
+            stall["stages"] = [
+                r["stage"] for r in records
+                if r["thread"] == "MainThread" and r["start"] < stall_end and r["start"] + r["seconds"] > stall["start"]
+            ]
+        return {
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "duration_seconds": round(time.perf_counter() - self.origin, 2),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "peak_rss_bytes": peak_rss(),
+            "summary": self.summary(),
+            "stages": records,
+            "stalls": stalls,
+            "total_stall_seconds": round(sum(stall["seconds"] for stall in stalls), 4),
+        }
+
+    def write_report(self, file_path):
+        """Writes report() as JSON and, when cProfile is on, the merged profiles to '<name>.prof'."""
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        with self.lock:
+            profiles = list(self.profiles)
+        if profiles:
+            import pstats
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(os.path.splitext(file_path)[0] + ".prof")
+
+
+# Session-wide profiler used by the GUI and the engine helpers
+profiler = Profiler()
+
+
+def stage(name, rows=None):
+    """Shortcut for profiler.stage()."""
+    return profiler.stage(name, rows)
+
+
+def default_report_path():
+    """'dumb-profile-<date>-<time>.json' in the current directory."""
+    return os.path.abspath(time.strftime("dumb-profile-%Y%m%d-%H%M%S.json"))
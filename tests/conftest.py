@@ -0,0 +1,93 @@
+"""
+Shared fixtures: small variant and components exports built in memory, in
+the columns of an Odoo export.
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bom_engine
+
+
+def variant_export(variants):
+    """[(variant id, template id, 'Attr: Value, ...'), ...] -> a variant export DataFrame."""
+    return pd.DataFrame({
+        bom_engine.VARIANT_ID_COLUMN: [v[0] for v in variants],
+        bom_engine.PRODUCT_GROUP_COLUMN: [v[1] for v in variants],
+        bom_engine.PRODUCT_GROUP_NAME_COLUMN: [v[1].title() for v in variants],
+        bom_engine.VARIANT_COLUMN: [v[2] for v in variants],
+    })
+
+
+def components_export(products):
+    """[(name, id, uom), ...] -> a components export DataFrame."""
+    return pd.DataFrame({
+        bom_engine.PRODUCT_COLUMN: [p[0] for p in products],
+        bom_engine.PRODUCT_ID_COLUMN: [p[1] for p in products],
+        bom_engine.UOM_COLUMN: [p[2] for p in products],
+    })
+
+
+@pytest.fixture
+def variant_index():
+    """Two templates: a table with Size x Material and a drawer with Material."""
+    return bom_engine.VariantIndex(variant_export([
+        ("table_s_oak", "table", "Size: S, Material: Oak"),
+        ("table_s_pine", "table", "Size: S, Material: Pine"),
+        ("table_l_oak", "table", "Size: L, Material: Oak"),
+        ("table_l_pine", "table", "Size: L, Material: Pine"),
+        ("drawer_oak", "drawer", "Material: Oak"),
+        ("drawer_pine", "drawer", "Material: Pine"),
+    ]))
+
+
+@pytest.fixture
+def catalog():
+    return bom_engine.build_product_info_map(components_export([
+        ("Leg", "leg", "Units"),
+        ("Top S", "top_s", "Units"),
+        ("Top L", "top_l", "Units"),
+        ("Oak board", "oak", "m2"),
+        ("Pine board", "pine", "m2"),
+        ("Screw", "screw", "Units"),
+        ("Drawer Oak", "drawer_oak", "Units"),
+        ("Drawer Pine", "drawer_pine", "Units"),
+    ]))
+
+
+def line(name, qty=1.0):
+    return bom_engine.ComponentLine(name, qty)
+
+
+@pytest.fixture
+def mapping(catalog):
+    """Legs and tops per size, boards per material; drawers made of boards and screws."""
+    mapping = bom_engine.BomMapping()
+    table = mapping.assignments("table")
+    table[("Size", "S")] = [line("Leg", 4), line("Top S")]
+    table[("Size", "L")] = [line("Leg", 6), line("Top L")]
+    table[("Material", "Oak")] = [line("Oak board", 2), line("Drawer Oak")]
+    table[("Material", "Pine")] = [line("Pine board", 2), line("Drawer Pine")]
+    drawer = mapping.assignments("drawer")
+    drawer[("Material", "Oak")] = [line("Oak board", 0.5), line("Screw", 8)]
+    drawer[("Material", "Pine")] = [line("Pine board", 0.5), line("Screw", 8)]
+    mapping.resolve(catalog)
+    return mapping
+
+
+def bom_rows(variant_index, mapping, tmpl_id, rules=None):
+    return list(bom_engine.iter_bom_rows(
+        variant_index.iter_variants(tmpl_id), mapping.assignments(tmpl_id), 1.0, "Kit", rules
+    ))
+
+
+def boms(rows):
+    """BoM rows -> {variant id: [(component id, qty), ...]}."""
+    return {
+        variant_id: [(row[4], row[5]) for row in block]
+        for variant_id, block in bom_engine.iter_bom_blocks(rows)
+    }
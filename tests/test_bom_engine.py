@@ -0,0 +1,296 @@
+import csv
+import os
+import stat
+
+import pytest
+
+import bom_engine
+from conftest import bom_rows, boms, components_export, line, variant_export
+
+
+# ------------------ PARSING ------------------
+
+def test_variant_index_lookups(variant_index):
+    assert variant_index.template_attributes("table") == {"Size": ["S", "L"], "Material": ["Oak", "Pine"]}
+    assert variant_index.variant_values(0) == [("Size", "S"), ("Material", "Oak")]
+    oak_rows = variant_index.value_rows[("Material", "Oak")].tolist()
+    assert [variant_index.variant_ids[row] for row in oak_rows] == ["table_s_oak", "table_l_oak", "drawer_oak"]
+
+
+def test_value_positions_are_per_template(variant_index):
+    # Material values are shared by both templates; positions only cover the template's own variants
+    positions = variant_index.value_positions("drawer")
+    assert list(positions) == [("Material", "Oak"), ("Material", "Pine")]
+    assert positions[("Material", "Pine")].tolist() == [1]
+    table = variant_index.value_positions("table")
+    assert table[("Material", "Oak")].tolist() == [0, 2]
+    assert variant_index.value_positions("missing") == {}
+
+
+def test_catalog_lookup(catalog):
+    assert catalog.get("Leg") == ("leg", "Units")
+    assert catalog.get("Missing", ("", "")) == ("", "")
+    assert "Screw" in catalog and len(catalog) == 8
+
+
+# ------------------ BOM ROWS ------------------
+
+def test_bom_rows_carry_header_on_first_line(variant_index, mapping):
+    rows = bom_rows(variant_index, mapping, "table")
+    assert rows[0] == ["table", "table_s_oak", "Kit", 1.0, "leg", 4, "Units"]
+    assert rows[1][:4] == ["", "", "", ""]
+    assert boms(rows)["table_l_pine"] == [("leg", 6), ("top_l", 1.0), ("pine", 2), ("drawer_pine", 1.0)]
+
+
+def test_mapping_round_trip(tmp_path, mapping, catalog):
+    mapping.subassemblies.add("Drawer Oak")
+    mapping.rules("table").append(bom_engine.CombinationRule([("Size", "L")], "add", line("Screw", 4)))
+    path = str(tmp_path / "mapping.json")
+    mapping.save(path)
+    loaded = bom_engine.load_mapping(path, catalog)
+    assert loaded.subassemblies == {"Drawer Oak"}
+    assert loaded.assignments("table")[("Size", "L")][0].product_id == "leg"
+    assert loaded.rules("table")[0].describe() == "Size = L"
+
+
+# ------------------ COMBINATION RULES ------------------
+
+def test_rules_add_exclude_and_override(variant_index, mapping, catalog):
+    rules = mapping.rules("table")
+    rules.append(bom_engine.CombinationRule([("Size", "L"), ("Material", "Oak")], "add", line("Screw", 2)))
+    rules.append(bom_engine.CombinationRule([("Material", "Pine")], "exclude", line("Drawer Pine")))
+    rules.append(bom_engine.CombinationRule([("Size", "S")], "qty", line("Leg", 3)))
+    mapping.resolve(catalog)
+    result = boms(bom_rows(variant_index, mapping, "table",
+                           bom_engine.TemplateRules(variant_index, "table", rules)))
+    assert ("screw", 2) in result["table_l_oak"]
+    assert ("screw", 2) not in result["table_s_oak"]
+    assert "drawer_pine" not in [product for product, _ in result["table_s_pine"]]
+    assert result["table_s_oak"][0] == ("leg", 3)
+    # Overrides work on copies: the shared assignment keeps its quantity
+    assert mapping.assignments("table")[("Size", "S")][0].qty == 4
+
+
+# ------------------ DELTA EXPORT ------------------
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_delta_export_writes_changed_and_removed(tmp_path, variant_index, mapping, catalog):
+    full = str(tmp_path / "full.csv")
+    assert bom_engine.write_bom_export(full, bom_rows(variant_index, mapping, "table")) == (4, [], [full])
+    previous = bom_engine.read_manifest(full)
+    # Hashing the CSV gives the manifest's hashes
+    assert previous == bom_engine.read_manifest(bom_engine.manifest_path(full))
+
+    mapping.assignments("table")[("Size", "L")] = [line("Leg", 8)]
+    mapping.assignments("table")[("Material", "Pine")] = []
+    mapping.assignments("table")[("Size", "S")] = []
+    mapping.resolve(catalog)
+    delta = str(tmp_path / "delta.csv")
+    count, removed, _ = bom_engine.write_bom_export(delta, bom_rows(variant_index, mapping, "table"), previous)
+    # Every remaining BoM changed; table_s_pine has no component left
+    assert count == 3
+    assert removed == ["table_s_pine"]
+    assert [row[0] for row in read_csv(bom_engine.removed_list_path(delta))] == ["product_id/id", "table_s_pine"]
+
+
+def test_unchanged_export_writes_nothing(tmp_path, variant_index, mapping):
+    full = str(tmp_path / "full.csv")
+    bom_engine.write_bom_export(full, bom_rows(variant_index, mapping, "table"))
+    again = str(tmp_path / "again.csv")
+    previous = bom_engine.read_manifest(full)
+    assert bom_engine.write_bom_export(again, bom_rows(variant_index, mapping, "table"), previous) == (0, [], [again])
+    assert read_csv(again) == [bom_engine.BOM_FIELDNAMES]
+
+
+def test_delta_against_a_delta_export_keeps_removals(tmp_path, variant_index, mapping, catalog):
+    full = str(tmp_path / "full.csv")
+    bom_engine.write_bom_export(full, bom_rows(variant_index, mapping, "table"))
+    mapping.assignments("table")[("Size", "L")] = [line("Leg", 8), line("Top L")]
+    mapping.resolve(catalog)
+    delta = str(tmp_path / "delta.csv")
+    assert bom_engine.write_bom_export(delta, bom_rows(variant_index, mapping, "table"),
+                                       bom_engine.read_manifest(full))[:2] == (2, [])
+
+    # The delta CSV only holds the L variants; its manifest covers all four
+    mapping.assignments("table")[("Size", "S")] = []
+    mapping.assignments("table")[("Material", "Pine")] = []
+    again = str(tmp_path / "again.csv")
+    count, removed, _ = bom_engine.write_bom_export(again, bom_rows(variant_index, mapping, "table"),
+                                                    bom_engine.read_manifest(delta))
+    assert (count, removed) == (2, ["table_s_pine"])
+
+
+def test_previous_chunk_reads_the_export_manifest(tmp_path, variant_index, mapping):
+    path = str(tmp_path / "boms.csv")
+    bom_engine.write_bom_export(path, bom_rows(variant_index, mapping, "table"), chunk_boms=3, workers=1)
+    previous = bom_engine.read_manifest(bom_engine.chunk_path(path, 1))
+    assert previous == bom_engine.read_manifest(bom_engine.manifest_path(path))
+    assert len(previous) == 4
+
+
+def test_chunks_never_split_a_bom(tmp_path, variant_index, mapping):
+    path = str(tmp_path / "boms.csv")
+    count, removed, paths = bom_engine.write_bom_export(path, bom_rows(variant_index, mapping, "table"),
+                                                        chunk_boms=3, workers=1)
+    assert (count, removed) == (4, [])
+    assert paths == [bom_engine.chunk_path(path, 1), bom_engine.chunk_path(path, 2)]
+    first = read_csv(bom_engine.chunk_path(path, 1))[1:]
+    second = read_csv(bom_engine.chunk_path(path, 2))[1:]
+    assert sum(1 for row in first if row[0]) == 3 and len(first) == 12
+    assert second[0][1] == "table_l_pine" and len(second) == 4
+
+
+def test_batch_since_previous_run(tmp_path, variant_index, mapping):
+    first = str(tmp_path / "first")
+    results = bom_engine.run_batch(variant_index, mapping, first, workers=1)
+    assert [(r[0], r[2]) for r in results] == [("table", 4), ("drawer", 2)]
+    second = str(tmp_path / "second")
+    results = bom_engine.run_batch(variant_index, mapping, second, workers=1, since_dir=first)
+    assert [(r[0], r[2], r[3]) for r in results] == [("table", 0, []), ("drawer", 0, [])]
+
+
+# ------------------ MULTI-LEVEL BOMS ------------------
+
+def test_multi_level_orders_subassemblies_first(variant_index, mapping):
+    mapping.subassemblies.update({"Drawer Oak", "Drawer Pine"})
+    expander = bom_engine.BomExpander(variant_index, mapping)
+    rows = list(expander.iter_bom_rows(variant_index.template_rows["table"], "Kit"))
+    order = [variant_id for variant_id, _ in bom_engine.iter_bom_blocks(rows)]
+    assert order == ["drawer_oak", "table_s_oak", "drawer_pine", "table_s_pine", "table_l_oak", "table_l_pine"]
+    assert expander.template_order(["table"]) == ["drawer", "table"]
+
+
+def test_multi_level_flattens_requirements(variant_index, mapping):
+    mapping.subassemblies.add("Drawer Oak")
+    mapping.assignments("table")[("Material", "Oak")][1].qty = 2
+    expander = bom_engine.BomExpander(variant_index, mapping)
+    requirements = dict(expander.requirements([variant_index.variant_ids.index("table_l_oak")]))
+    assert requirements["table_l_oak"] == {
+        ("Leg", "leg", "Units"): 6,
+        ("Top L", "top_l", "Units"): 1.0,
+        ("Oak board", "oak", "m2"): 2 + 2 * 0.5,
+        ("Screw", "screw", "Units"): 16,
+    }
+
+
+def test_multi_level_reports_cycles():
+    variant_index = bom_engine.VariantIndex(variant_export([
+        ("a", "tmpl_a", "Kind: A"),
+        ("b", "tmpl_b", "Kind: B"),
+    ]))
+    catalog = bom_engine.build_product_info_map(
+        components_export([("Part A", "a", "Units"), ("Part B", "b", "Units")])
+    )
+    mapping = bom_engine.BomMapping()
+    mapping.assignments("tmpl_a")[("Kind", "A")] = [line("Part B")]
+    mapping.assignments("tmpl_b")[("Kind", "B")] = [line("Part A")]
+    mapping.subassemblies.update({"Part A", "Part B"})
+    mapping.resolve(catalog)
+    expander = bom_engine.BomExpander(variant_index, mapping)
+    with pytest.raises(bom_engine.EngineError, match="cycle: a -> b -> a"):
+        expander.ordered_rows([0])
+
+
+# ------------------ VALIDATION ------------------
+
+def test_validator_reports_problems(variant_index, mapping, catalog):
+    mapping.assignments("table")[("Size", "S")].append(line("Typo part"))
+    mapping.assignments("drawer")[("Material", "Pine")] = []
+    issues = bom_engine.MappingValidator(variant_index).validate(mapping, catalog)
+    assert issues.unknown == [("table", "Typo part")]
+    assert issues.unmapped == [("drawer", ("Material", "Pine"))]
+    assert issues.uncovered == [("drawer", "drawer_pine")]
+    assert issues.has_errors()
+
+
+def test_validator_checks_only_the_given_templates(variant_index, mapping, catalog):
+    mapping.assignments("table")[("Size", "S")].append(line("Typo part"))
+    mapping.assignments("drawer")[("Material", "Pine")] = []
+    validator = bom_engine.MappingValidator(variant_index)
+    issues = validator.validate(mapping, catalog, ["drawer"])
+    assert (issues.unknown, issues.uncovered) == ([], [("drawer", "drawer_pine")])
+    # Variants given a component by an 'add' rule are covered
+    mapping.rules("drawer").append(bom_engine.CombinationRule([("Material", "Pine")], "add", line("Screw")))
+    assert validator.validate(mapping, catalog, ["drawer"]).uncovered == []
+
+
+def test_cli_strict_stops_on_unknown_components(tmp_path):
+    variant_path, components_path = str(tmp_path / "variants.csv"), str(tmp_path / "components.csv")
+    variant_export([("v1", "tmpl", "Size: S")]).to_csv(variant_path, index=False)
+    components_export([("Leg", "leg", "Units")]).to_csv(components_path, index=False)
+    cli_mapping = bom_engine.BomMapping()
+    cli_mapping.assignments("tmpl")[("Size", "S")] = [line("Leg"), line("Typo part")]
+    mapping_path = str(tmp_path / "mapping.json")
+    cli_mapping.save(mapping_path)
+    args = [variant_path, components_path, mapping_path, "-o", str(tmp_path / "out"), "-j", "1", "--no-cache"]
+    assert bom_engine.main(args) == 0
+    with pytest.raises(SystemExit) as exit_info:
+        bom_engine.main(args + ["--strict"])
+    assert exit_info.value.code == 1
+
+
+def test_validator_reports_components_without_id_or_uom(variant_index, mapping):
+    catalog = bom_engine.build_product_info_map(components_export([
+        ("Leg", None, "Units"), ("Top S", "top_s", None), ("Top L", "top_l", "Units"),
+    ]))
+    issues = bom_engine.MappingValidator(variant_index).validate(mapping, catalog, ["table"])
+    assert issues.missing_id == [("table", "Leg")]
+    assert issues.missing_uom == [("table", "Top S")]
+    assert issues.has_errors()
+    assert "1 component(s) without product id" in issues.summary()
+
+
+def test_validator_with_an_empty_catalog(variant_index, mapping):
+    issues = bom_engine.MappingValidator(variant_index).validate(
+        mapping, bom_engine.build_product_info_map(components_export([])), ["drawer"]
+    )
+    assert [name for _, name in issues.unknown] == ["Oak board", "Screw", "Pine board"]
+    assert issues.missing_id == issues.missing_uom == []
+
+
+def test_cli_prints_the_written_chunks(tmp_path, capsys):
+    variant_path, components_path = str(tmp_path / "variants.csv"), str(tmp_path / "components.csv")
+    variant_export([("v1", "tmpl", "Size: S"), ("v2", "tmpl", "Size: L")]).to_csv(variant_path, index=False)
+    components_export([("Leg", "leg", "Units")]).to_csv(components_path, index=False)
+    cli_mapping = bom_engine.BomMapping()
+    cli_mapping.assignments("tmpl").update({("Size", "S"): [line("Leg")], ("Size", "L"): [line("Leg", 2)]})
+    mapping_path = str(tmp_path / "mapping.json")
+    cli_mapping.save(mapping_path)
+    out = tmp_path / "out"
+    assert bom_engine.main([variant_path, components_path, mapping_path, "-o", str(out), "-j", "1",
+                            "--no-cache", "--chunk-size", "1"]) == 0
+    first, last = str(out / "tmpl_001.csv"), str(out / "tmpl_002.csv")
+    assert f"tmpl: 2 BoMs -> {first} ... {last} (2 files)" in capsys.readouterr().out
+    assert sorted(p.name for p in out.glob("tmpl*.csv")) == ["tmpl_001.csv", "tmpl_002.csv"]
+
+
+def test_chunks_of_a_longer_earlier_export_are_removed(tmp_path, variant_index, mapping):
+    path = str(tmp_path / "boms.csv")
+    bom_engine.write_bom_export(path, bom_rows(variant_index, mapping, "table"), chunk_boms=1, workers=1)
+    (tmp_path / "boms_extra.csv").write_text("kept")
+    (tmp_path / "other_005.csv").write_text("kept")
+    _, _, paths = bom_engine.write_bom_export(path, bom_rows(variant_index, mapping, "table"),
+                                              chunk_boms=3, workers=1)
+    assert bom_engine.existing_chunks(path) == paths == [bom_engine.chunk_path(path, 1),
+                                                         bom_engine.chunk_path(path, 2)]
+    assert (tmp_path / "boms_extra.csv").exists() and (tmp_path / "other_005.csv").exists()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permissions")
+def test_outputs_follow_the_umask_or_the_replaced_file(tmp_path, variant_index, mapping, monkeypatch):
+    monkeypatch.setattr(bom_engine, "_new_file_mode", None)
+    old_umask = os.umask(0o022)
+    try:
+        path = tmp_path / "boms.csv"
+        bom_engine.write_bom_export(str(path), bom_rows(variant_index, mapping, "table"))
+        assert stat.S_IMODE(path.stat().st_mode) == 0o644
+        assert stat.S_IMODE((tmp_path / "boms.manifest.json").stat().st_mode) == 0o644
+        path.chmod(0o664)
+        bom_engine.write_bom_export(str(path), bom_rows(variant_index, mapping, "table"))
+        assert stat.S_IMODE(path.stat().st_mode) == 0o664
+    finally:
+        os.umask(old_umask)
@@ -0,0 +1,56 @@
+import os
+import pickle
+
+import cache
+
+
+class Unpicklable:
+    """Fails to load like a pickle written by another pandas version (ValueError)."""
+
+    def __reduce__(self):
+        return (int, ("not a number",))
+
+
+def test_load_builds_once(tmp_path):
+    source = tmp_path / "export.csv"
+    source.write_text("name\nLeg\n")
+    parsed = cache.ParsedCache(str(tmp_path / "cache"))
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"rows": 1}
+
+    assert parsed.load("components", str(source), build) == {"rows": 1}
+    assert parsed.load("components", str(source), build) == {"rows": 1}
+    assert len(calls) == 1
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    source = tmp_path / "export.csv"
+    source.write_text("name\nLeg\n")
+    parsed = cache.ParsedCache(str(tmp_path / "cache"))
+    parsed.load("components", str(source), lambda: "first")
+    # Replace the stored pickle with one that fails with ValueError when loaded
+    (entry,) = parsed._read_index().values()
+    with open(os.path.join(parsed.directory, entry["file"]), "wb") as f:
+        pickle.dump(Unpicklable(), f)
+    assert parsed.load("components", str(source), lambda: "rebuilt") == "rebuilt"
+
+
+def test_index_write_failure_does_not_stop_a_load(tmp_path, monkeypatch):
+    source = tmp_path / "export.csv"
+    source.write_text("name\nLeg\n")
+    parsed = cache.ParsedCache(str(tmp_path / "cache"))
+    parsed.load("components", str(source), lambda: "first")
+
+    def fail(index):
+        raise PermissionError("read-only cache")
+    monkeypatch.setattr(parsed, "_write_index", fail)
+    assert parsed.load("components", str(source), lambda: "rebuilt") == "first"
+    assert parsed.load("variants", str(source), lambda: "built") == "built"
+
+
+def test_key_includes_library_versions(tmp_path):
+    key = cache.ParsedCache(str(tmp_path))._entry_key("components", "abc")
+    assert cache.library_versions() in key
@@ -0,0 +1,68 @@
+import os
+import sys
+import xmlrpc.client
+
+import pytest
+
+import odoo_rpc
+from conftest import bom_rows
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+
+import odoo_mock
+
+
+@pytest.fixture
+def odoo():
+    """Starts a mock Odoo; yields a function (mock) -> connection pool."""
+    servers = []
+
+    def connect(mock, **kwargs):
+        server, url = odoo_mock.serve(mock)
+        servers.append(server)
+        return odoo_rpc.ConnectionPool(url, odoo_mock.MOCK_DB, odoo_mock.MOCK_USER, odoo_mock.MOCK_PASSWORD,
+                                       **kwargs)
+    yield connect
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_import_creates_every_bom(odoo, variant_index, mapping):
+    mock = odoo_mock.MockOdoo()
+    result = odoo_rpc.import_boms(odoo(mock, size=2), bom_rows(variant_index, mapping, "table"), batch_size=3)
+    assert result == {"created": 4, "errors": []}
+    assert len(mock.boms) == 4 and len(mock.boms[0]["bom_line_ids"]) == 4
+
+
+def test_lost_reply_is_not_created_twice(odoo, variant_index, mapping, monkeypatch):
+    monkeypatch.setattr(odoo_rpc.time, "sleep", lambda seconds: None)
+    # The BoMs of every second batch are created but the reply never arrives
+    mock = odoo_mock.MockOdoo(fail_every=2)
+    result = odoo_rpc.import_boms(odoo(mock, size=1), bom_rows(variant_index, mapping, "table"), batch_size=1)
+    assert result == {"created": 4, "errors": []}
+    assert len(mock.boms) == len({bom["product_id"] for bom in mock.boms}) == 4
+    assert mock.create_calls == 4
+
+
+class RefusingOdoo(odoo_mock.MockOdoo):
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        if (model, method) == ("mrp.bom", "create"):
+            self.create_calls += 1
+            raise xmlrpc.client.Fault(1, "ValidationError: quantity must be positive")
+        return super().execute_kw(db, uid, password, model, method, args, kwargs)
+
+
+def test_odoo_errors_are_not_retried(odoo, variant_index, mapping, monkeypatch):
+    monkeypatch.setattr(odoo_rpc.time, "sleep", lambda seconds: pytest.fail("retried a Fault"))
+    mock = RefusingOdoo()
+    result = odoo_rpc.import_boms(odoo(mock, size=1), bom_rows(variant_index, mapping, "table"))
+    assert result["created"] == 0
+    assert result["errors"] == [(None, "Batch of 4 BoMs refused by Odoo: ValidationError: quantity must be positive")]
+    assert mock.create_calls == 1
+
+
+def test_calls_time_out(odoo):
+    pool = odoo(odoo_mock.MockOdoo(latency=1), timeout=0.2)
+    with pytest.raises(OSError):
+        pool.execute("uom.uom", "search_read", [("name", "in", ["Units"])], fields=["name"])
@@ -0,0 +1,45 @@
+from product_search import ProductSearchIndex
+
+NAMES = [
+    "Bracket steel 40mm",
+    "Bracket oak 60mm",
+    "Oak board 18mm",
+    "Screw M4x20",
+    "Screw M4x30",
+    "Wall bracket",
+]
+
+
+def test_empty_query_lists_names_alphabetically():
+    assert ProductSearchIndex(NAMES).search("", limit=2) == ["Bracket oak 60mm", "Bracket steel 40mm"]
+
+
+def test_prefix_ranks_before_words_and_substrings():
+    results = ProductSearchIndex(NAMES).search("bracket")
+    assert results[:2] == ["Bracket oak 60mm", "Bracket steel 40mm"]
+    assert results[2] == "Wall bracket"
+
+
+def test_words_in_any_order():
+    assert ProductSearchIndex(NAMES).search("oak bracket") == ["Bracket oak 60mm"]
+
+
+def test_substring_match():
+    assert ProductSearchIndex(NAMES).search("x30") == ["Screw M4x30"]
+
+
+def test_typo_match():
+    assert ProductSearchIndex(NAMES).search("brakcet oak") == ["Bracket oak 60mm"]
+
+
+def test_limit():
+    assert len(ProductSearchIndex(NAMES).search("s", limit=2)) == 2
+
+
+def test_substring_offsets_with_names_longer_when_folded():
+    # 'ß' folds to 'ss' and 'ﬁ' to 'fi': the folded haystack is longer than the names
+    names = ["aß%d" % i for i in range(10)] + ["ﬁnish oak", "b1 target", "c2 other"]
+    index = ProductSearchIndex(names)
+    assert index.search("arget") == ["b1 target"]
+    assert index.search("ther") == ["c2 other"]
+    assert index.search("nish") == ["ﬁnish oak"]
@@ -0,0 +1,39 @@
+import cProfile
+
+import pytest
+
+import profiling
+
+
+def test_stage_records_duration_and_rows():
+    profiler = profiling.Profiler()
+    with profiler.stage("file_load") as record:
+        record["rows"] = 10
+    summary = profiler.summary()["file_load"]
+    assert summary["count"] == 1 and summary["rows"] == 10
+
+
+class ActiveProfile(cProfile.Profile):
+    """Behaves like Python 3.12+ while another profiler is enabled."""
+
+    def enable(self, *args, **kwargs):
+        raise ValueError("Another profiling tool is already active")
+
+
+def test_profile_thread_runs_when_another_profiler_is_active(monkeypatch):
+    monkeypatch.setattr(profiling.cProfile, "Profile", ActiveProfile)
+    profiler = profiling.Profiler()
+    profiler.cprofile = True
+    ran = []
+    with profiler.profile_thread():
+        ran.append(1)
+    assert ran == [1] and profiler.profiles == []
+
+
+def test_profile_thread_keeps_errors_of_the_block():
+    profiler = profiling.Profiler()
+    profiler.cprofile = True
+    with pytest.raises(KeyError):
+        with profiler.profile_thread():
+            raise KeyError("task failed")
+    assert len(profiler.profiles) == 1